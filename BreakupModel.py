@@ -84,6 +84,28 @@ def calc_M(m_s, m_d, v):
     M[E_p < 40] = m_d[E_p < 40]*v # non-catestrophic collision
     return M
 
+def calc_M_broadcast(m_s, m_d, v):
+    '''
+    calculates the M factor used for L distribution calculation, for masses and velocities
+    that already broadcast against each other
+
+    Parameter(s):
+    m_s : satellite mass (array, kg)
+    m_d : mass of the debris (array, kg)
+    v : collision velocity (array, km/s)
+
+    Keyword parameter(s): None
+
+    Output(s):
+    M : value of M parameter for each combination (variable units)
+
+    Note(s): same as calc_M, but the output shape is given by numpy broadcasting instead
+    of being built from 1-d or 2-d m_d
+    '''
+
+    E_p = (0.5*m_d*((v*1000)**2)/m_s)/1000 # E_p in J/g
+    return np.where(E_p >= 40, m_s + m_d, m_d*v) # catestrophic or non-catestrophic collision
+
 def calc_Ntot(M, Lmin, Lmax, typ, C=1):
     '''
     calculates the total number of debris produced with characteristic length
@@ -66,9 +66,9 @@ class Cell:
         # setup initial values for tracking satallites
         self.num_sat_types = len(S_i)
         self.num_rb_types = len(R_i)
-        self.S = [S_i]
-        self.S_d = [S_di]
-        self.D = [D_i]
+        self.S = np.array([S_i], dtype=np.double) # histories are indexed by (time, type)
+        self.S_d = np.array([S_di], dtype=np.double)
+        self.D = np.array([D_i], dtype=np.double)
         self.m_sat = m_sat
         self.sigma_sat = sigma_sat
         self.sigma_sat_km = self.sigma_sat/1e6 # same thing, but in km^2
@@ -89,7 +89,7 @@ class Cell:
         self.expl_rate_D = expl_rate_D
 
         # setup initial values for tracking rockets
-        self.R = [R_i]
+        self.R = np.array([R_i], dtype=np.double)
         self.m_rb = m_rb
         self.sigma_rb = sigma_rb
         self.sigma_rb_km = self.sigma_rb/1e6
@@ -100,11 +100,12 @@ class Cell:
         self.expl_rate_R = expl_rate_R
 
         # setup initial debris values
-        self.N_bins = [N_i]
+        self.N_bins = np.array([N_i], dtype=np.double)
 
         # setup other variables
-        self.C_c = [0] # catastrophic collisions
-        self.C_nc = [0] # non-catastrophic collisions
+        self.C_c = np.zeros(1, dtype=np.double) # catastrophic collisions
+        self.C_nc = np.zeros(1, dtype=np.double) # non-catastrophic collisions
+        self.hist_view = False # whether or not the histories are views into an NCell's history arrays
         self.event_list = event_list
         self.alt = alt
         self.dh = dh
@@ -135,6 +136,28 @@ class Cell:
         self.ascending = np.full(self.num_sat_types, False) # list of which satellite types are ascending
         for i in range(self.num_sat_types):
             if self.target_alt[i] > self.alt + self.dh/2 : self.ascending[i] = True
+        self.update_coll_factors()
+
+    def __getstate__(self):
+        '''
+        returns the state of the Cell used for pickling/copying
+
+        Parameter(s): None
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        state : dictionary of the Cell's attributes
+
+        Note(s): if the histories are views into an NCell's history arrays they are left out, since
+        they would otherwise be pickled as full copies. the owning NCell re-binds them on unpickling.
+        '''
+
+        state = self.__dict__.copy()
+        if self.hist_view:
+            for key in ['S', 'S_d', 'D', 'R', 'N_bins', 'C_c', 'C_nc']:
+                del state[key]
+        return state
 
     def save(self, filepath, filter, filter_len):
         '''
@@ -159,19 +182,14 @@ class Cell:
         csv_file.close()
 
         # write easy arrays
-        Cc_array, Cnc_array = np.array(self.C_c)[filter], np.array(self.C_nc)[filter]
+        num_t = filter.size # number of time points with valid data
+        Cc_array, Cnc_array = self.C_c[:num_t][filter], self.C_nc[:num_t][filter]
         to_save = {'C_c' : Cc_array, 'C_nc' : Cnc_array, 'tau_N' : self.tau_N, 'trackable' : self.trackable,
                    'ascending' : self.ascending, 'logL' : self.logL_edges, 'chi' : self.chi_edges}
         np.savez_compressed(filepath + "data.npz", **to_save)
 
         # write N_bins values
-        N_dict = dict()
-        index = 0
-        for i in range(len(self.N_bins)):
-            if filter[i]:
-                N_dict[str(index)] = self.N_bins[i]
-                index += 1
-        np.savez_compressed(filepath + "N_bins.npz", **N_dict)
+        np.savez_compressed(filepath + "N_bins.npz", N_bins=self.N_bins[:num_t][filter])
 
         # write cat table values
         cat_dict = {'sat' : self.cat_sat_N, 'rb' : self.cat_rb_N}
@@ -185,7 +203,7 @@ class Cell:
         for i in range(self.num_rb_types):
             rb_path = filepath + 'RocketBody' + str(i) + '/'
             os.mkdir(rb_path)
-            self.save_rb(rb_path, filter)
+            self.save_rb(rb_path, filter, filter_len, i)
 
     def save_sat(self, filepath, filter, filter_len, i):
         '''
@@ -204,23 +222,14 @@ class Cell:
         csv_file = open(filepath + 'params.csv', 'w', newline='')
         csv_writer = csv.writer(csv_file, dialect='unix')
         csv_writer.writerow([self.m_sat[i], self.sigma_sat[i], self.del_t[i], self.fail_t[i], self.tau_do[i], 
-                             self.target_alt[i], self.up_time[i], self.alphaS[i], self.alphaD[i], self.alphaN[i], 
-                             self.alphaR[i], self.P[i], self.AM_sat[i], self.tau_sat[i], self.C_sat[i], 
+                             self.target_alt[i], self.up_time[i], self.alpha_S[i], self.alpha_D[i], self.alpha_N[i], 
+                             self.alpha_R[i], self.P[i], self.AM_sat[i], self.tau_sat[i], self.C_sat[i], 
                              self.expl_rate_L[i], self.expl_rate_D[i]])
         csv_file.close()
 
         # save data
-        S_array = np.empty(filter_len, dtype=np.double)
-        Sd_array = np.empty(filter_len, dtype=np.double)
-        D_array = np.empty(filter_len, dtype=np.double)
-        index = 0
-        for j in range(len(self.S)):
-            if filter[j]:
-                S_array[index] = self.S[j][i]
-                Sd_array[index] = self.S_d[j][i]
-                D_array[index] = self.D[j][i]
-                index += 1
-        to_save = {'S' : S_array, 'S_d' : Sd_array, 'D' : D_array}
+        num_t = filter.size
+        to_save = {'S' : self.S[:num_t, i][filter], 'S_d' : self.S_d[:num_t, i][filter], 'D' : self.D[:num_t, i][filter]}
         np.savez_compressed(filepath + "data.npz", **to_save)
     
     def save_rb(self, filepath, filter, filter_len, i):
@@ -244,13 +253,7 @@ class Cell:
         csv_file.close()
 
         # save data
-        R_array = np.empty(filter_len, dtype=np.double)
-        index = 0
-        for j in range(len(self.R)):
-            if filter[j]:
-                R_array[index] = self.R[j][i]
-                index += 1
-        to_save = {'R' : R_array}
+        to_save = {'R' : self.R[:filter.size, i][filter]}
         np.savez_compressed(filepath + "data.npz", **to_save)
 
     def load(filepath):
@@ -286,8 +289,8 @@ class Cell:
 
         # load basic arrays
         array_dict = np.load(filepath + "data.npz")
-        cell.C_c = array_dict['C_c'].tolist()
-        cell.C_nc = array_dict['C_nc'].tolist()
+        cell.C_c = array_dict['C_c']
+        cell.C_nc = array_dict['C_nc']
         cell.tau_N = array_dict['tau_N']
         cell.trackable = array_dict['trackable']
         cell.ascending = array_dict['ascending']
@@ -309,16 +312,11 @@ class Cell:
         cell.V = 4*np.pi*(6371 + cell.alt)**2*cell.dh # volume of the shell
 
         # load N_bins values
-        cell.N_bins = []
         bins_dict = np.load(filepath + "N_bins.npz")
-        i = 0
-        while True:
-            try:
-                N_bins = bins_dict[str(i)]
-                cell.N_bins.append(N_bins)
-            except KeyError:
-                break
-            i += 1
+        if 'N_bins' in bins_dict:
+            cell.N_bins = bins_dict['N_bins']
+        else: # older saves have one entry per time step
+            cell.N_bins = np.array([bins_dict[str(i)] for i in range(len(bins_dict.files))], dtype=np.double)
         
         # load cat table values
         cat_dict = np.load(filepath + "cat_tables.npz")
@@ -326,14 +324,10 @@ class Cell:
         cell.cat_rb_N = cat_dict['rb']
 
         # setup variables for satellites
-        cell.S = []
-        cell.S_d = []
-        cell.D = []
         tot_num_data = len(cell.N_bins) # number of time data points
-        for i in range(tot_num_data):
-            cell.S.append(np.empty(cell.num_sat_types, dtype=np.double))
-            cell.S_d.append(np.empty(cell.num_sat_types, dtype=np.double))
-            cell.D.append(np.empty(cell.num_sat_types, dtype=np.double))
+        cell.S = np.empty((tot_num_data, cell.num_sat_types), dtype=np.double)
+        cell.S_d = np.empty((tot_num_data, cell.num_sat_types), dtype=np.double)
+        cell.D = np.empty((tot_num_data, cell.num_sat_types), dtype=np.double)
         cell.m_sat = np.empty(cell.num_sat_types, dtype=np.double)
         cell.sigma_sat = np.empty(cell.num_sat_types, dtype=np.double)
         cell.del_t = np.empty(cell.num_sat_types, dtype=np.double)
@@ -360,9 +354,7 @@ class Cell:
         cell.sigma_sat_km = cell.sigma_sat/1e6
 
         # setup variables for rockets
-        cell.R = []
-        for i in range(tot_num_data):
-            cell.R.append(np.empty(cell.num_rb_types, dtype=np.double))
+        cell.R = np.empty((tot_num_data, cell.num_rb_types), dtype=np.double)
         cell.m_rb = np.empty(cell.num_rb_types, dtype=np.double)
         cell.sigma_rb = np.empty(cell.num_rb_types, dtype=np.double)
         cell.lam_rb = np.empty(cell.num_rb_types, dtype=np.double) 
@@ -375,7 +367,12 @@ class Cell:
             rb_path = filepath + 'RocketBody' + str(i) + '/'
             cell.load_rb(rb_path, i)
 
+        # compute related parameters
+        cell.sigma_rb_km = cell.sigma_rb/1e6
+
         cell.event_list = []
+        cell.hist_view = False
+        cell.update_coll_factors()
         return cell
 
     def load_sat(self, filepath, i):
@@ -396,11 +393,11 @@ class Cell:
         csv_reader = csv.reader(csv_file, dialect='unix')
         for row in csv_reader: # there's only one row, but this extracts it
             self.m_sat[i], self.sigma_sat[i], self.del_t[i] = float(row[0]), float(row[1]), float(row[2])
-            self.tau_do[i], self.target_alt[i], self.up_time[i] = float(row[3]), float(row[4]), float(row[5])
-            self.alphaS[i], self.alphaD[i], self.alphaN[i] = float(row[6]), float(row[7]), float(row[8])
-            self.alphaR[i], self.P[i], self.AM_sat[i] = float(row[9]), float(row[10]), float(row[11])
-            self.tau_sat[i], self.C_sat[i], self.expl_rate_L[i] = float(row[12]), float(row[13]), float(row[14])
-            self.expl_rate_D[i] = float(row[15])
+            self.fail_t[i], self.tau_do[i], self.target_alt[i] = float(row[3]), float(row[4]), float(row[5])
+            self.up_time[i], self.alpha_S[i], self.alpha_D[i] = float(row[6]), float(row[7]), float(row[8])
+            self.alpha_N[i], self.alpha_R[i], self.P[i] = float(row[9]), float(row[10]), float(row[11])
+            self.AM_sat[i], self.tau_sat[i], self.C_sat[i] = float(row[12]), float(row[13]), float(row[14])
+            self.expl_rate_L[i], self.expl_rate_D[i] = float(row[15]), float(row[16])
         csv_file.close()
 
         # load data
@@ -408,10 +405,9 @@ class Cell:
         S_sat = data_dict['S']
         D_sat = data_dict['D']
         Sd_sat = data_dict['S_d']
-        for j in range(S_sat.size):
-            self.S[j][i] = S_sat[j]
-            self.S_d[j][i] = Sd_sat[j]
-            self.D[j][i] = D_sat[j]
+        self.S[:, i] = S_sat
+        self.S_d[:, i] = Sd_sat
+        self.D[:, i] = D_sat
 
     def load_rb(self, filepath, i):
         '''
@@ -438,11 +434,10 @@ class Cell:
         # load data
         data_dict = np.load(filepath + "data.npz")
         R_rb = data_dict['R']
-        for j in range(R_rb.size):
-            self.R[j][i] = R_rb[j]
+        self.R[:, i] = R_rb
 
     def dxdt_cell(self, time):
-        ''' TODO move some array creation to __init__ and load
+        '''
         calculates the rate of collisions and decays from each debris bin, the rate
         of decaying/de-orbiting satellites, the rate of launches/deorbit starts of satallites, 
         and the rate of creation of derelicts at the given time, due only to events in the cell
@@ -484,55 +479,26 @@ class Cell:
         R_loc = self.R[time]
 
         # handle satellite-debris collisions
-        dSdt = np.resize(N_loc, (self.num_sat_types, self.num_L, self.num_chi)) # collisions with live satallites
-        dSdt = np.swapaxes(dSdt, 2, 0) # must be done temporairly for broadcasting
-        dS_ddt = np.array(dSdt) # collisions with de-orbiting satellites
-        dDdt = np.array(dSdt) # collisions with derelict satellites
-        dSdt *= self.sigma_sat_km*self.v_kyr*S_loc/self.V # compute rates of collision
-        dS_ddt *= self.sigma_sat_km*self.v_kyr*Sd_loc/self.V
-        dDdt *= self.sigma_sat_km*self.v_kyr*D_loc/self.V
-        dSdt[:,self.trackable,:] *= self.alpha_N # account for collision avoidance
-        dS_ddt[:,self.trackable,:] *= self.alpha_N
-        dSdt = np.swapaxes(dSdt,0,2) # switch axes back
-        dS_ddt = np.swapaxes(dS_ddt,0,2) # switch axes back
-        dDdt = np.swapaxes(dDdt,0,2) # switch axes back
-
-        # handle satellite-satellite collisions
-        sigma1_2d = np.resize(self.sigma_sat_km, (self.num_sat_types, self.num_sat_types))
-        sigma2_2d = sigma1_2d.transpose()
-        sigma_comb = sigma1_2d + sigma2_2d + 2*np.sqrt(sigma1_2d*sigma2_2d) # account for increased cross-section
-        alphaS1 = np.resize(self.alpha_S, (self.num_sat_types, self.num_sat_types))
-        alphaS2 = alphaS1.transpose()
-        alphaD1 = np.resize(self.alpha_D, (self.num_sat_types, self.num_sat_types))
-        S1 = np.resize(S_loc, (self.num_sat_types, self.num_sat_types))
-        S2 = S1.transpose()
-        S_d1 = np.resize(Sd_loc, (self.num_sat_types, self.num_sat_types))
-        S_d2 = S_d1.transpose()
-        D1 = np.resize(D_loc, (self.num_sat_types, self.num_sat_types))
-        D2 = D1.transpose()
-
-        # calculate collision rates
-        dSSdt = alphaS1*alphaS2*sigma_comb*self.v_kyr*S1*S2/self.V
-        dSS_ddt = alphaS1*alphaS2*sigma_comb*self.v*S1*S_d2/self.V
-        dSDdt = alphaD1*sigma_comb*self.v_kyr*S1*D2/self.V
-        dS_dS_ddt = alphaS1*alphaS2*sigma_comb*self.v_kyr*S_d1*S_d2/self.V
-        dS_dDdt = alphaD1*sigma_comb*self.v_kyr*S_d1*D2/self.V
-        dDDdt = sigma_comb*self.v_kyr*D1*D2/self.V  # collisions cannot be avoided
-
-        # compute collisions between satellites and rocket bodies
-        sigma1_2d = np.resize(self.sigma_sat_km, (self.num_rb_types, self.num_sat_types)).transpose()
-        sigma2_2d = np.resize(self.sigma_rb_km, (self.num_sat_types, self.num_rb_types))
-        sigma_comb = sigma1_2d + sigma2_2d + 2*np.sqrt(sigma1_2d*sigma2_2d) # account for increased cross-section
-        alphaR1 = np.resize(self.alpha_R, (self.num_rb_types, self.num_sat_types)).transpose()
-        S1 = np.resize(S_loc, (self.num_rb_types, self.num_sat_types)).transpose()
-        S_d1 = np.resize(Sd_loc, (self.num_rb_types, self.num_sat_types)).transpose()
-        D1 = np.resize(D_loc, (self.num_rb_types, self.num_sat_types)).transpose()
-        R2 = np.resize(R_loc, (self.num_sat_types, self.num_rb_types))
-
-        # calculate collision rates
-        dSRdt = alphaR1*sigma_comb*self.v_kyr*S1*R2/self.V
-        dS_dRdt = alphaR1*sigma_comb*self.v_kyr*S_d1*R2/self.V
-        dDRdt = sigma_comb*self.v_kyr*D1*R2/self.V # collisions cannot be avoided
+        dSdt = N_loc*(self.NS_fac*S_loc)[:,None,None]*self.alphaN_L[:,:,None] # collisions with live satallites
+        dS_ddt = N_loc*(self.NS_fac*Sd_loc)[:,None,None]*self.alphaN_L[:,:,None] # collisions with de-orbiting satellites
+        dDdt = N_loc*(self.NS_fac*D_loc)[:,None,None] # collisions with derelict satellites
+
+        # calculate satellite-satellite collision rates
+        S1, S2 = S_loc[None,:], S_loc[:,None]
+        S_d1, S_d2 = Sd_loc[None,:], Sd_loc[:,None]
+        D1, D2 = D_loc[None,:], D_loc[:,None]
+        dSSdt = self.SS_fac*S1*S2
+        dSS_ddt = self.SSd_fac*S1*S_d2
+        dSDdt = self.SD_fac*S1*D2
+        dS_dS_ddt = self.SS_fac*S_d1*S_d2
+        dS_dDdt = self.SD_fac*S_d1*D2
+        dDDdt = self.DD_fac*D1*D2  # collisions cannot be avoided
+
+        # calculate collisions between satellites and rocket bodies
+        R2 = R_loc[None,:]
+        dSRdt = self.SR_fac*S_loc[:,None]*R2
+        dS_dRdt = self.SR_fac*Sd_loc[:,None]*R2
+        dDRdt = self.DR_fac*D_loc[:,None]*R2 # collisions cannot be avoided
 
         # compute explosion rates for satellites
         expl_S = self.expl_rate_L*S_loc/100
@@ -545,37 +511,15 @@ class Cell:
         ascend_S = np.zeros(self.num_sat_types)
         ascend_S[self.ascending] = S_loc[self.ascending]/self.up_time[self.ascending]
 
-        # sum everything up
-        double_count_filter_sat = np.full((self.num_sat_types, self.num_sat_types), False)
-        double_count_filter_rb = np.full((self.num_rb_types, self.num_rb_types), False)
-        for i in range(self.num_sat_types):
-            for j in range(i+1,self.num_sat_types):
-                double_count_filter_sat[i,j] = True
-        for i in range(self.num_rb_types):
-            for j in range(i+1,self.num_rb_types):
-                double_count_filter_rb[i,j] = True
-
-        # diagonals are to account for objects of the same type colliding
+        # sum everything up, diagonals are to account for objects of the same type colliding
         dSdt_tot = 0 - kill_S - np.sum(dSdt, axis=(1,2)) - np.sum(dSSdt, axis=1) - np.sum(dSS_ddt, axis=1) - np.sum(dSDdt, axis=1) - np.diag(dSSdt) - np.sum(dSRdt, axis=1) - expl_S
         dS_ddt_tot = self.P*kill_S - np.sum(dS_ddt, axis=(1,2)) - np.sum(dSS_ddt, axis=0) - np.sum(dS_dS_ddt, axis=1) - np.sum(dS_dDdt, axis=1) - np.diag(dS_dS_ddt) - np.sum(dS_dRdt, axis=1) - expl_Sd
         dDdt_tot = (1-self.P)*kill_S - np.sum(dDdt, axis=(1,2), where=self.cat_sat_N) + np.sum(dSdt, axis=(1,2), where=self.cat_sat_N==False) + np.sum(dDdt, axis=(1,2), where=self.cat_sat_N==False) - np.sum(dSDdt, axis=1) - np.sum(dS_dDdt, axis=1) - np.sum(dDDdt, axis=0) - np.diag(dDDdt) - np.sum(dDRdt, axis=1) - expl_D
         CS_dt = dSdt + dS_ddt + dDdt # total collisions between satellites and debris
 
-        # handle rocket-debris collisions
-        dRdt = np.resize(N_loc, (self.num_rb_types, self.num_L, self.num_chi)) # collisions with rockets
-        dRdt = np.swapaxes(dRdt, 0, 2) # must be done temporairly for broadcasting
-        dRdt *= self.sigma_rb_km*self.v_kyr*R_loc/self.V # compute rates of collision
-        dRdt = np.swapaxes(dRdt,0,2) # switch axes back
-
-        # handle rocket-rocket collisions
-        sigma1_2d = np.resize(self.sigma_rb_km, (self.num_rb_types, self.num_rb_types))
-        sigma2_2d = sigma1_2d.transpose()
-        sigma_comb = sigma1_2d + sigma2_2d + 2*np.sqrt(sigma1_2d*sigma2_2d) # account for increased cross-section
-        R1 = np.resize(R_loc, (self.num_rb_types, self.num_rb_types))
-        R2 = R1.transpose()
-
-        # calculate collision rate
-        dRRdt = sigma_comb*self.v_kyr*R1*R2/self.V
+        # handle rocket-debris and rocket-rocket collisions
+        dRdt = N_loc*(self.NR_fac*R_loc)[:,None,None]
+        dRRdt = self.RR_fac*R_loc[None,:]*R_loc[:,None]
 
         # handle rocket explosions, decays
         expl_R = self.expl_rate_R*R_loc/100
@@ -588,8 +532,8 @@ class Cell:
         decay_N = N_loc/self.tau_N
 
         # set values to zero to avoid double-counting later on
-        dSSdt[double_count_filter_sat], dS_dS_ddt[double_count_filter_sat], dDDdt[double_count_filter_sat] = 0, 0, 0
-        dRRdt[double_count_filter_rb] = 0
+        dSSdt[self.double_count_filter_sat], dS_dS_ddt[self.double_count_filter_sat], dDDdt[self.double_count_filter_sat] = 0, 0, 0
+        dRRdt[self.double_count_filter_rb] = 0
 
         # compute return values
         D_dt = dSSdt + dSS_ddt + dSDdt + dS_dS_ddt + dS_dDdt + dDDdt
@@ -599,6 +543,26 @@ class Cell:
         # return everything
         return dSdt_tot, dS_ddt_tot, dDdt_tot, dRdt_tot, ascend_S, deorbit_S, decay_D, decay_R, decay_N, D_dt, RD_dt, dRRdt, CS_dt, dRdt, expl_S_tot, expl_R
 
+    def update_coll_factors(self):
+        '''
+        updates the population-independent collision rate factors used by dxdt_cell, based on
+        the current cross-sections, collision avoidance fractions, v, and shell volume
+
+        Parameter(s): None
+
+        Keyword Parameter(s): None
+
+        Output(s): None
+
+        Note(s): needs to be called again if any of the parameters it depends on are changed
+        '''
+
+        self.SS_fac, self.SSd_fac, self.SD_fac, self.DD_fac, self.SR_fac, self.DR_fac, self.RR_fac, self.NS_fac, self.NR_fac, self.alphaN_L = calc_coll_factors(
+            self.sigma_sat_km, self.sigma_rb_km, self.alpha_S, self.alpha_D, self.alpha_R, self.alpha_N, self.trackable, self.v, self.v_kyr, self.V)
+        # filters for setting values to zero to avoid double-counting same-type pairs
+        self.double_count_filter_sat = np.triu(np.full((self.num_sat_types, self.num_sat_types), True), k=1)
+        self.double_count_filter_rb = np.triu(np.full((self.num_rb_types, self.num_rb_types), True), k=1)
+
     def update_cat_N(self):
         '''
         updates values in cat_N based on current mass, v, and bins
@@ -618,3 +582,86 @@ class Cell:
             for j in range(self.num_L):
                 for k in range(self.num_chi):
                     self.cat_rb_N[i,j,k] = is_catastrophic(self.m_rb[i], self.L_ave[j], self.AM_ave[k], self.v)
+
+def calc_coll_factors(sigma_sat_km, sigma_rb_km, alpha_S, alpha_D, alpha_R, alpha_N, trackable, v, v_kyr, V):
+    '''
+    calculates the population-independent factors of the collision rates in a cell, i.e. everything
+    but the two populations involved
+
+    Parameter(s):
+    sigma_sat_km : collision cross-section of each satellite type (array, km^2)
+    sigma_rb_km : collision cross-section of each rocket body type (array, km^2)
+    alpha_S : fraction of collisions with live satellites that are not avoided, for each type (array)
+    alpha_D : fraction of collisions with derelicts that are not avoided, for each type (array)
+    alpha_R : fraction of collisions with rocket bodies that are not avoided, for each type (array)
+    alpha_N : fraction of collisions with trackable debris that are not avoided, for each type (array)
+    trackable : which L bins are trackable (array of booleans)
+    v : relative collision speed (km/s)
+    v_kyr : relative collision speed (km/yr)
+    V : volume of the shell (km^3)
+
+    Keyword Parameter(s): None
+
+    Output(s):
+    SS_fac : factor for live-live and deorbiting-deorbiting collisions (2-d array, km^3/yr)
+    SSd_fac : factor for live-deorbiting collisions (2-d array)
+    SD_fac : factor for live-derelict and deorbiting-derelict collisions (2-d array, km^3/yr)
+    DD_fac : factor for derelict-derelict collisions (2-d array, km^3/yr)
+    SR_fac : factor for live/deorbiting-rocket collisions (2-d array, km^3/yr)
+    DR_fac : factor for derelict-rocket collisions (2-d array, km^3/yr)
+    RR_fac : factor for rocket-rocket collisions (2-d array, km^3/yr)
+    NS_fac : factor for satellite-debris collisions (array, km^3/yr)
+    NR_fac : factor for rocket-debris collisions (array, km^3/yr)
+    alphaN_L : collision avoidance factor of each satellite type for each L bin (2-d array)
+
+    Note(s): the per-type parameters can have leading (i.e. cell) axes, in which case v, v_kyr, and V
+    must be arrays of that leading shape. pair factors are indexed [..., i, j], with the rate of
+    collisions being factor*X[j]*Y[i] (satellite-rocket factors are indexed [..., satellite, rocket])
+    '''
+
+    v, v_kyr, V = np.asarray(v)[...,None,None], np.asarray(v_kyr)[...,None,None], np.asarray(V)[...,None,None]
+    sigma1, sigma2 = sigma_sat_km[...,None,:], sigma_sat_km[...,:,None]
+    sigma_comb = sigma1 + sigma2 + 2*np.sqrt(sigma1*sigma2) # account for increased cross-section
+    alphaSS = alpha_S[...,None,:]*alpha_S[...,:,None]
+    SS_fac = alphaSS*sigma_comb*v_kyr/V
+    SSd_fac = alphaSS*sigma_comb*v/V
+    SD_fac = alpha_D[...,None,:]*sigma_comb*v_kyr/V
+    DD_fac = sigma_comb*v_kyr/V
+
+    sigma1, sigma2 = sigma_sat_km[...,:,None], sigma_rb_km[...,None,:]
+    sigma_comb = sigma1 + sigma2 + 2*np.sqrt(sigma1*sigma2)
+    SR_fac = alpha_R[...,:,None]*sigma_comb*v_kyr/V
+    DR_fac = sigma_comb*v_kyr/V
+
+    sigma1, sigma2 = sigma_rb_km[...,None,:], sigma_rb_km[...,:,None]
+    sigma_comb = sigma1 + sigma2 + 2*np.sqrt(sigma1*sigma2)
+    RR_fac = sigma_comb*v_kyr/V
+
+    NS_fac = sigma_sat_km*v_kyr[...,0]/V[...,0]
+    NR_fac = sigma_rb_km*v_kyr[...,0]/V[...,0]
+    alphaN_L = np.where(trackable, alpha_N[...,None], 1.0)
+
+    return SS_fac, SSd_fac, SD_fac, DD_fac, SR_fac, DR_fac, RR_fac, NS_fac, NR_fac, alphaN_L
+
+def comb_sum(sigma_i, sqrt_sigma_i, sigma_j, sqrt_sigma_j, w):
+    '''
+    calculates sum_j sigma_comb[..., i, j]*w[..., j] for each i, without building the (i, j) matrix, using
+    sigma_comb[..., i, j] = (sqrt(sigma_i[..., i]) + sqrt(sigma_j[..., j]))^2
+
+    Parameter(s):
+    sigma_i : cross-sections of the objects being summed for (array, km^2)
+    sqrt_sigma_i : square root of sigma_i (array, km)
+    sigma_j : cross-sections of the objects being summed over (array, km^2)
+    sqrt_sigma_j : square root of sigma_j (array, km)
+    w : weight of each object being summed over (array)
+
+    Keyword Parameter(s): None
+
+    Output(s):
+    total : weighted sum of the combined cross-sections for each i (array, km^2)
+
+    Note(s): all inputs can have leading (i.e. cell) axes, the sums are over the last axis only
+    '''
+
+    w0, w1, w2 = np.sum(w, axis=-1), np.sum(sigma_j*w, axis=-1), np.sum(sqrt_sigma_j*w, axis=-1)
+    return sigma_i*w0[...,None] + w1[...,None] + 2*sqrt_sigma_i*w2[...,None]
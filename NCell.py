@@ -3,12 +3,18 @@
 from Cell import *
 from Events import *
 import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu, expm
+from scipy.integrate import solve_ivp
 from BreakupModel import *
 from AtmosphericDecayModels import *
+from NumbaKernels import numba_available, drag_lifetimes
 from copy import deepcopy
+from multiprocessing import shared_memory
 import os
 import shutil
 import csv
+import pickle
 
 G = 6.67430e-11 # gravitational constant (N*m^2/kg^2)
 Re = 6371 # radius of Earth (km)
@@ -16,12 +22,35 @@ Me = 5.97219e24 # mass of Earth (kg)
 
 class NCell:
 
+    # per-cell parameters that are stacked into NCell arrays (see setup_params)
+    sat_param_keys = ['m_sat', 'sigma_sat', 'sigma_sat_km', 'del_t', 'fail_t', 'tau_do', 'target_alt', 'up_time', 'alpha_S',
+                      'alpha_D', 'alpha_R', 'alpha_N', 'P', 'AM_sat', 'tau_sat', 'C_sat', 'expl_rate_L', 'expl_rate_D', 'ascending']
+    rb_param_keys = ['m_rb', 'sigma_rb', 'sigma_rb_km', 'lam_rb', 'AM_rb', 'tau_rb', 'C_rb', 'expl_rate_R']
+    debris_param_keys = ['tau_N', 'cat_sat_N', 'cat_rb_N']
+    # cached collision rate factors (see Cell.update_coll_factors)
+    coll_factor_keys = ['SS_fac', 'SSd_fac', 'SD_fac', 'DD_fac', 'SR_fac', 'DR_fac', 'RR_fac', 'NS_fac', 'NR_fac', 'alphaN_L']
+    # names of the probability tables in saved files, and the attributes they're stored in
+    prob_table_keys = {'sat_coll_tables' : 'sat_coll_probability_tables', 'rb_coll_tables' : 'rb_coll_probability_tables',
+                       'sat_expl_tables' : 'sat_expl_probability_tables', 'rb_expl_tables' : 'rb_expl_probability_tables'}
+    # tables that are the same for every scenario of a parameter sweep, which can be shared between processes (see share_tables)
+    shared_table_keys = list(prob_table_keys.values()) + ['source_tables', 'bin_masses', 'yield_SN', 'yield_RN']
+    # Butcher tableaux (A, b, b_err, order of the error estimate) for the embedded Runge-Kutta pairs used by
+    # run_sim_rk. both pairs are first-same-as-last, with the last stage evaluated at the new values
+    rk_tableaux = {'BS23' : (np.array([[0, 0, 0, 0], [1/2, 0, 0, 0], [0, 3/4, 0, 0], [2/9, 1/3, 4/9, 0]]),
+                             np.array([2/9, 1/3, 4/9, 0]), np.array([7/24, 1/4, 1/3, 1/8]), 2),
+                   'DP45' : (np.array([[0, 0, 0, 0, 0, 0, 0], [1/5, 0, 0, 0, 0, 0, 0], [3/40, 9/40, 0, 0, 0, 0, 0],
+                                       [44/45, -56/15, 32/9, 0, 0, 0, 0], [19372/6561, -25360/2187, 64448/6561, -212/729, 0, 0, 0],
+                                       [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656, 0, 0],
+                                       [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]]),
+                             np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]),
+                             np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40]), 4)}
+
     def __init__(self, S, S_d, D, N_l, target_alts, alt_edges, lam, update_period=1/12, min_lifetime=0, CD=2.2, m0=0, min_dt=0, 
                 max_dt=0.1, dtfactor=1/100, t_max=np.inf, setF107=None, events=[], R_i=None, lam_rb=None, up_time=None, 
                 del_t=None, fail_t=None, expl_rate_L=None, expl_rate_D=None, C_sat=None, sigma_sat=None, expl_rate_R=None, 
                 C_rb=None, sigma_rb=None, v=None, delta=None, alphaS=None, alphaD=None, alphaN=None, alphaR=None, P=None, 
                 m_s=None, m_rb=None, AM_sat=None, AM_rb=None, tau_do=None, L_min=1e-3, L_max=1, num_L=10, chi_min=-2, chi_max=1.0, 
-                num_chi=10, num_dir=1000, table_path=None):
+                num_chi=10, num_dir=1000, table_path=None, sparse_tables=False, table_cutoff=0, backend='numpy', dtype=np.double):
         '''
         Constructor for NCell class
     
@@ -84,6 +113,13 @@ class NCell:
         num_chi : number of debris bins in log10(A/M) (default 10)
         num_dir : number of random directions to sample in creating probability tables (default 1000)
         table_path : path to save probability tables (string or None, must be saved in format used in NCell.save)
+        sparse_tables : whether or not to store the probability tables as sparse matrices, only keeping the
+                        (event cell, final cell) pairs that can be reached (bool, default False)
+        table_cutoff : probabilities below this are dropped from sparse probability tables (default 0)
+        backend : either 'numpy', or 'numba' to use the compiled kernels in NumbaKernels for updating the drag
+                  lifetimes, falls back to 'numpy' if numba isn't installed (default 'numpy')
+        dtype : floating point type used to store the populations and probability tables, i.e. np.single to halve
+                their memory use (default np.double)
 
         Output(s):
         NCell instance
@@ -91,7 +127,8 @@ class NCell:
         Note: no size checks are done on the arrays, the program will crash if any of the arrays differ in size.
         shells are assumed to be given in order of ascending altitude. if you only want to pass values in the
         keyword argument for certain shells, put None in the list for all other shells. internally, cells have
-        padded space in their arrays, use the getter functions to clean those up.
+        padded space in their arrays, use the getter functions to clean those up. with sparse_tables, the
+        probability tables are scipy csr_matrix objects indexed (event cell, final cell*num_L*num_chi).
         '''
 
         if len(S) == 0: # check if there's no shells
@@ -145,8 +182,9 @@ class NCell:
         self.num_L = num_L
         self.num_chi = num_chi
         self.time = 0 # index of current time step
-        self.lupdate_time = 0 # index of last time drag lifetimes were updated
-        self.t = [0] # list of times traversed
+        self.lupdate_t = 0 # last time drag lifetimes were updated (yr)
+        self.precor_state = None # integrator state kept between calls to run_sim_precor
+        self.t = np.zeros(1) # times traversed (padded, only valid up to self.time)
         self.cells = [] # start list of cells
         # generate bins for log10(L), chi
         self.logL_edges = np.linspace(np.log10(L_min), np.log10(L_max), num=num_L+1)
@@ -165,6 +203,15 @@ class NCell:
             for j in range(self.num_chi):
                 self.bin_masses[i,j] = A/self.AM_ave[j]
         self.num_dir = num_dir
+        self.sparse_tables = sparse_tables
+        self.table_cutoff = table_cutoff
+        if backend == 'numba' and not numba_available:
+            print('WARNING : numba is not installed, using the numpy backend')
+            backend = 'numpy'
+        self.backend = backend
+        self.dtype = np.dtype(np.double) # changed to dtype once everything is set up
+        self.shared_tables, self.shared_path = None, None # tables set up by share_tables
+        self.table_blocks, self.shared_views = {}, {}
 
         for i in range(self.num_cells): # iterate through shells
 
@@ -362,6 +409,9 @@ class NCell:
             self.cells.append(cell)
             if i == self.num_cells - 1: self.upper_N = deepcopy(N_initial) # take the debris field above to be initial debris of top
 
+        self.setup_history(1) # move the cell histories into contiguous arrays
+        self.setup_params() # stack the cell parameters for the batched rate calculation
+
         # generate uniformly distributed directions using Fibbonacci spiral
         phi, theta = np.empty(num_dir), np.empty(num_dir)
         golden = (1+np.sqrt(5))/2 # golden ratio
@@ -372,24 +422,15 @@ class NCell:
             theta[i] = np.arccos(1-2*y)
         # check how probability tables will be aquired
         if table_path is None: # generate tables
-            # setup probability tables (arguments are collision bin, final bin, logL, chi)
-            self.sat_coll_probability_tables = np.zeros((self.num_cells, self.num_cells, self.num_L, self.num_chi))
-            self.rb_coll_probability_tables = np.zeros((self.num_cells, self.num_cells, self.num_L, self.num_chi))
-            self.sat_expl_probability_tables = np.zeros((self.num_cells, self.num_cells, self.num_L, self.num_chi))
-            self.rb_expl_probability_tables = np.zeros((self.num_cells, self.num_cells, self.num_L, self.num_chi))
-            # compute probability tables
-            for i in range(self.num_cells):
-                self.fill_prob_tables(phi, theta)
+            self.fill_prob_tables(phi, theta)
         else: # load tables
-            prob_dict = np.load(table_path)
-            self.sat_coll_probability_tables = prob_dict['sat_coll_tables']
-            self.rb_coll_probability_tables = prob_dict['rb_coll_tables']
-            self.sat_expl_probability_tables = prob_dict['sat_expl_tables']
-            self.rb_expl_probability_tables = prob_dict['rb_expl_tables']
+            self.load_prob_tables(np.load(table_path))
+        self.setup_source_tables()
+        self.set_dtype(dtype)
 
     def fill_prob_tables(self, phi, theta):
         '''
-        calculates probability tables
+        calculates probability tables (arguments are collision bin, final bin, logL, chi)
 
         Input(s):
         phi : list of phi components of directions
@@ -398,10 +439,26 @@ class NCell:
         Keyword Input(s): None
 
         Output(s): None
+
+        Note(s): with sparse_tables, only the (event cell, final cell) pairs that can be reached, and
+        probabilities of at least table_cutoff, are stored
         '''
 
         L_min, L_max = 10**self.logL_edges[0], 10**self.logL_edges[-1] # edges of the parameter space
         chi_min, chi_max = self.chi_edges[0], self.chi_edges[-1]
+        # probability of L being in each bin
+        L_prob_coll = L_cdf(10**self.logL_edges[1:], L_min, L_max, 'coll') - L_cdf(10**self.logL_edges[:-1], L_min, L_max, 'coll')
+        L_prob_expl = L_cdf(10**self.logL_edges[1:], L_min, L_max, 'expl') - L_cdf(10**self.logL_edges[:-1], L_min, L_max, 'expl')
+        # probability of chi, for each bin
+        chi_prob_sat = X_cdf(self.chi_edges[1:], chi_min, chi_max, self.L_ave, 'sat') - X_cdf(self.chi_edges[:-1], chi_min, chi_max, self.L_ave, 'sat')
+        chi_prob_rb = X_cdf(self.chi_edges[1:], chi_min, chi_max, self.L_ave, 'rb') - X_cdf(self.chi_edges[:-1], chi_min, chi_max, self.L_ave, 'rb')
+
+        shape = (self.num_cells, self.num_cells, self.num_L, self.num_chi)
+        num_bins = self.num_L*self.num_chi
+        if self.sparse_tables: # build compressed sparse row tables, one (L, chi) block per reachable pair
+            data, indices, indptr = ([], [], [], []), [], [0]
+        else:
+            tables = (np.zeros(shape), np.zeros(shape), np.zeros(shape), np.zeros(shape))
         for i in range(self.num_cells): # iterate through where the event occurs
             v0 = self.cells[i].v_orbit*1000 # orbital velocity in m/s
             r = self.cells[i].alt # in km
@@ -423,27 +480,451 @@ class NCell:
                     # do monte-carlo integration
                     sum_coll = np.sum(coll_probs, 1)
                     sum_expl = np.sum(expl_probs, 1)
-                    self.sat_coll_probability_tables[i,j,:,:] = sum_coll/self.num_dir # save the results
-                    self.rb_coll_probability_tables[i,j,:,:] = sum_coll/self.num_dir
-                    self.sat_expl_probability_tables[i,j,:,:] = sum_expl/self.num_dir
-                    self.rb_expl_probability_tables[i,j,:,:] = sum_expl/self.num_dir
+                    # compute total result
+                    blocks = (sum_coll/self.num_dir*L_prob_coll[:,None]*chi_prob_sat, sum_coll/self.num_dir*L_prob_coll[:,None]*chi_prob_rb,
+                              sum_expl/self.num_dir*L_prob_expl[:,None]*chi_prob_sat, sum_expl/self.num_dir*L_prob_expl[:,None]*chi_prob_rb)
+                    if self.sparse_tables:
+                        for k in range(4) : data[k].append(blocks[k].ravel())
+                        indices.append(j*num_bins + np.arange(num_bins))
+                    else:
+                        for k in range(4) : tables[k][i,j,:,:] = blocks[k] # save the results
+            if self.sparse_tables : indptr.append(len(indices)*num_bins)
+
+        if self.sparse_tables:
+            indices = np.concatenate(indices) if len(indices) > 0 else np.zeros(0, dtype=int)
+            tables = []
+            for k in range(4):
+                values = np.concatenate(data[k]) if len(data[k]) > 0 else np.zeros(0)
+                table = sparse.csr_matrix((values, indices, np.array(indptr)), shape=(shape[0], shape[1]*num_bins))
+                table.data[table.data < self.table_cutoff] = 0 # drop the negligible tails of the distributions
+                table.eliminate_zeros()
+                tables.append(table)
+        self.sat_coll_probability_tables, self.rb_coll_probability_tables = tables[0], tables[1]
+        self.sat_expl_probability_tables, self.rb_expl_probability_tables = tables[2], tables[3]
+
+    def load_prob_tables(self, prob_dict):
+        '''
+        sets the probability tables from saved data, converting them to the storage used by this NCell
 
-        # probability of L being in each bin
-        L_prob_coll = L_cdf(10**self.logL_edges[1:], L_min, L_max, 'coll') - L_cdf(10**self.logL_edges[:-1], L_min, L_max, 'coll')
-        L_prob_expl = L_cdf(10**self.logL_edges[1:], L_min, L_max, 'expl') - L_cdf(10**self.logL_edges[:-1], L_min, L_max, 'expl')
-        # probability of chi, for each bin
-        chi_prob_sat = X_cdf(self.chi_edges[1:], chi_min, chi_max, self.L_ave, 'sat') - X_cdf(self.chi_edges[:-1], chi_min, chi_max, self.L_ave, 'sat')
-        chi_prob_rb = X_cdf(self.chi_edges[1:], chi_min, chi_max, self.L_ave, 'rb') - X_cdf(self.chi_edges[:-1], chi_min, chi_max, self.L_ave, 'rb')
-        # compute total result
-        for i in range(self.num_chi): # this loop is needed or broadcasting gets ugly
-            self.sat_coll_probability_tables[:,:,:,i] *= L_prob_coll
-            self.rb_coll_probability_tables[:,:,:,i] *= L_prob_coll
-            self.sat_expl_probability_tables[:,:,:,i] *= L_prob_expl
-            self.rb_expl_probability_tables[:,:,:,i] *= L_prob_expl
-        self.sat_coll_probability_tables *= chi_prob_sat
-        self.sat_expl_probability_tables *= chi_prob_sat
-        self.rb_coll_probability_tables *= chi_prob_rb
-        self.rb_expl_probability_tables *= chi_prob_rb
+        Input(s):
+        prob_dict : saved probability tables, in the format used by NCell.save (dict-like)
+
+        Keyword Input(s): None
+
+        Output(s): None
+        '''
+
+        shape = (self.num_cells, self.num_cells, self.num_L, self.num_chi)
+        for key, attr in self.prob_table_keys.items():
+            if key in prob_dict: # saved as a dense array
+                table = prob_dict[key]
+                if self.sparse_tables : table = sparse.csr_matrix(np.where(table < self.table_cutoff, 0, table).reshape(shape[0], -1))
+            else: # saved as the components of a sparse matrix
+                table = sparse.csr_matrix((prob_dict[key + '_data'], prob_dict[key + '_indices'], prob_dict[key + '_indptr']),
+                                          shape=(shape[0], shape[1]*shape[2]*shape[3]))
+                if not self.sparse_tables : table = table.toarray().reshape(shape)
+            setattr(self, attr, table)
+
+    def prob_table_row(self, table, indx):
+        '''
+        returns the distribution of debris from an event in the given cell
+
+        Input(s):
+        table : probability table to use (one of the NCell probability tables)
+        indx : index of the cell the event occurs in
+
+        Keyword Input(s): None
+
+        Output(s):
+        probs : probability of the debris ending up in each bin of each cell (3-d array)
+        '''
+
+        if self.sparse_tables:
+            return table[indx].toarray().reshape(self.num_cells, self.num_L, self.num_chi)
+        return table[indx,:,:,:]
+
+    def set_dtype(self, dtype):
+        '''
+        changes the floating point type used to store the populations and probability tables
+
+        Input(s):
+        dtype : new floating point type, i.e. np.single or np.double
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): the times, collision counts, and parameters are always kept in double precision, and rates are
+        calculated in double precision before being stored
+        '''
+
+        self.dtype = np.dtype(dtype)
+        for key in ['S', 'S_d', 'D', 'R', 'N_bins']:
+            setattr(self, key, getattr(self, key).astype(self.dtype))
+        self.bind_history()
+        for attr in self.prob_table_keys.values():
+            setattr(self, attr, getattr(self, attr).astype(self.dtype))
+        self.setup_source_tables()
+
+    def setup_source_tables(self):
+        '''
+        stacks the probability tables used by dxdt into a single (source, destination) matrix, so that the
+        debris from every source in every cell can be distributed with one matrix product
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): needs to be called again if the probability tables are changed. rows are collisions,
+        then satellite explosions, then rocket body explosions, each for every cell
+        '''
+
+        tables = (self.sat_coll_probability_tables, self.sat_expl_probability_tables, self.rb_expl_probability_tables)
+        if self.sparse_tables: # stored transposed, so the product is a sparse matrix-vector product
+            self.source_tables = sparse.vstack(tables).T.tocsr()
+        else:
+            self.source_tables = np.concatenate(tables).reshape(3*self.num_cells, self.num_cells*self.num_L*self.num_chi)
+
+    def share_tables(self, path=None):
+        '''
+        moves the tables in shared_table_keys into shared memory (or memory-mapped files), so that copies of the
+        NCell sent to other processes re-attach to them instead of carrying their own
+
+        Input(s): None
+
+        Keyword Input(s):
+        path : directory to write the tables to as memory-mapped .npy files, if None multiprocessing.shared_memory
+               blocks are used instead (string or None, default None)
+
+        Output(s): None
+
+        Note(s): the process that calls this owns the tables, and should call release_tables(unlink=True) once
+        every copy is done with them. the shared tables are read-only, anything that replaces them (i.e.
+        set_dtype, update_yield_tables) gives that NCell private tables again. the drag lifetimes aren't shared,
+        since they're updated in place at different times in each run
+        '''
+
+        if self.shared_tables is not None:
+            print('WARNING : Tables are already shared')
+            return
+        self.shared_tables, self.shared_path = {}, path
+        for attr in self.shared_table_keys:
+            table = getattr(self, attr)
+            if sparse.issparse(table): # share the compressed sparse row components
+                arrays, matrix_shape = [table.data, table.indices, table.indptr], table.shape
+            else:
+                arrays, matrix_shape = [table], None
+            parts = []
+            for i in range(len(arrays)):
+                array = np.ascontiguousarray(arrays[i])
+                if path is None:
+                    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                    self.table_blocks[block.name] = block
+                    location = block.name
+                else:
+                    location = os.path.join(path, attr + str(i) + '.npy')
+                    np.save(location, array)
+                parts.append((location, array.shape, array.dtype.str))
+            self.shared_tables[attr] = (matrix_shape, parts)
+        self.attach_tables()
+
+    def attach_tables(self):
+        '''
+        points the NCell at the tables set up by share_tables, without copying them
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): called when unpickling an NCell with shared tables
+        '''
+
+        for attr, (matrix_shape, parts) in self.shared_tables.items():
+            arrays = []
+            for location, shape, dtype in parts:
+                if self.shared_path is None:
+                    if location not in self.table_blocks : self.table_blocks[location] = shared_memory.SharedMemory(name=location)
+                    array = np.ndarray(shape, dtype=dtype, buffer=self.table_blocks[location].buf)
+                    array.flags.writeable = False
+                else:
+                    array = np.load(location, mmap_mode='r')
+                arrays.append(array)
+            table = arrays[0] if matrix_shape is None else sparse.csr_matrix(tuple(arrays), shape=matrix_shape, copy=False)
+            setattr(self, attr, table)
+            self.shared_views[attr] = table
+
+    def release_tables(self, unlink=False):
+        '''
+        gives the NCell private copies of its shared tables, and detaches it from the shared ones
+
+        Input(s): None
+
+        Keyword Input(s):
+        unlink : if True, the shared memory blocks or files are also removed, this should only be done by the
+                 owner once every copy is done with them (bool, default False)
+
+        Output(s): None
+        '''
+
+        if self.shared_tables is None : return
+        for attr, view in self.shared_views.items():
+            if getattr(self, attr) is view : setattr(self, attr, view.copy())
+        self.shared_views = {}
+        for block in self.table_blocks.values():
+            block.close()
+            if unlink : block.unlink()
+        if unlink and self.shared_path is not None:
+            for _, parts in self.shared_tables.values():
+                for location, _, _ in parts:
+                    os.remove(location)
+        self.shared_tables, self.shared_path, self.table_blocks = None, None, {}
+
+    def setup_history(self, num_t):
+        '''
+        moves the histories of all Cells into contiguous arrays owned by the NCell, with room for at least
+        num_t time steps, and points the Cells at views into them
+
+        Input(s):
+        num_t : number of time steps to allocate space for
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): history arrays are indexed by (time, cell, ...), and only valid up to self.time. the populations
+        are stored with self.dtype, the times and collision counts are always double precision
+        '''
+
+        num_valid = self.time + 1 # number of valid time steps
+        self.hist_len = max(num_t, num_valid)
+        t = self.t
+        self.t = np.zeros(self.hist_len, dtype=np.double)
+        self.t[:num_valid] = t[:num_valid]
+        self.S = np.zeros((self.hist_len, self.num_cells, self.num_sat_types), dtype=self.dtype)
+        self.S_d = np.zeros((self.hist_len, self.num_cells, self.num_sat_types), dtype=self.dtype)
+        self.D = np.zeros((self.hist_len, self.num_cells, self.num_sat_types), dtype=self.dtype)
+        self.R = np.zeros((self.hist_len, self.num_cells, self.num_rb_types), dtype=self.dtype)
+        self.N_bins = np.zeros((self.hist_len, self.num_cells, self.num_L, self.num_chi), dtype=self.dtype)
+        self.C_c = np.zeros((self.hist_len, self.num_cells), dtype=np.double)
+        self.C_nc = np.zeros((self.hist_len, self.num_cells), dtype=np.double)
+        for i in range(self.num_cells):
+            cell = self.cells[i]
+            self.S[:num_valid, i, :] = cell.S[:num_valid]
+            self.S_d[:num_valid, i, :] = cell.S_d[:num_valid]
+            self.D[:num_valid, i, :] = cell.D[:num_valid]
+            self.R[:num_valid, i, :] = cell.R[:num_valid]
+            self.N_bins[:num_valid, i, :, :] = cell.N_bins[:num_valid]
+            self.C_c[:num_valid, i] = cell.C_c[:num_valid]
+            self.C_nc[:num_valid, i] = cell.C_nc[:num_valid]
+        self.bind_history()
+
+    def grow_history(self, num_t):
+        '''
+        makes sure the history arrays have room for at least num_t time steps, at least doubling
+        their size if they need to be re-allocated
+
+        Input(s):
+        num_t : number of time steps that need to fit in the history
+
+        Keyword Input(s): None
+
+        Output(s): None
+        '''
+
+        if num_t <= self.hist_len : return
+        new_len = max(num_t, 2*self.hist_len)
+        num_valid = self.time + 1
+        for key in ['t', 'S', 'S_d', 'D', 'R', 'N_bins', 'C_c', 'C_nc']:
+            old = getattr(self, key)
+            new = np.zeros((new_len,) + old.shape[1:], dtype=old.dtype)
+            new[:num_valid] = old[:num_valid]
+            setattr(self, key, new)
+        self.hist_len = new_len
+        self.bind_history()
+
+    def bind_history(self):
+        '''
+        points the history of each Cell at its view into the NCell history arrays
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s): None
+        '''
+
+        for i in range(self.num_cells):
+            cell = self.cells[i]
+            cell.S = self.S[:, i, :]
+            cell.S_d = self.S_d[:, i, :]
+            cell.D = self.D[:, i, :]
+            cell.R = self.R[:, i, :]
+            cell.N_bins = self.N_bins[:, i, :, :]
+            cell.C_c = self.C_c[:, i]
+            cell.C_nc = self.C_nc[:, i]
+            cell.hist_view = True
+
+    def setup_params(self):
+        '''
+        stacks the parameters of all Cells into (cell, ...) arrays owned by the NCell, and points the
+        Cells at views into them, so that rates can be calculated for every cell at once
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): parameters updated in-place through a Cell (i.e. drag lifetimes) are seen by the NCell,
+        replacing a Cell's parameter array outright is not
+        '''
+
+        for key in self.sat_param_keys + self.rb_param_keys + self.debris_param_keys:
+            setattr(self, key, np.array([getattr(cell, key) for cell in self.cells]))
+        self.v = np.array([cell.v for cell in self.cells], dtype=np.double) # per-cell constants
+        self.v_kyr = np.array([cell.v_kyr for cell in self.cells], dtype=np.double)
+        self.V = np.array([cell.V for cell in self.cells], dtype=np.double)
+        self.trackable = self.cells[0].trackable
+        self.update_coll_factors()
+
+    def update_coll_factors(self):
+        '''
+        updates the population-independent collision rate factors of every cell at once, and points
+        the Cells at views of them
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): needs to be called again if cross-sections, collision avoidance fractions, or v
+        are changed
+        '''
+
+        factors = calc_coll_factors(self.sigma_sat_km, self.sigma_rb_km, self.alpha_S, self.alpha_D, self.alpha_R,
+                                    self.alpha_N, self.trackable, self.v, self.v_kyr, self.V)
+        for key, factor in zip(self.coll_factor_keys, factors):
+            setattr(self, key, factor)
+        # pieces of the factors used to compute per-type collision totals without the pair matrices
+        self.sqrt_sigma_sat_km, self.sqrt_sigma_rb_km = np.sqrt(self.sigma_sat_km), np.sqrt(self.sigma_rb_km)
+        self.coll_scale, self.coll_scale_v = self.v_kyr/self.V, self.v/self.V
+        self.double_count_filter_sat = np.triu(np.full((self.num_sat_types, self.num_sat_types), True), k=1)
+        self.double_count_filter_rb = np.triu(np.full((self.num_rb_types, self.num_rb_types), True), k=1)
+        self.update_yield_tables()
+        self.bind_params()
+
+    def update_yield_tables(self):
+        '''
+        builds the tables of the number of fragments (between L_min and L_max) produced by each kind of
+        collision and explosion in every cell, so they don't need to be re-calculated every step
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): needs to be called again if the masses, explosion constants, or v are changed. called by
+        update_coll_factors, since the pair tables are also stored weighted by the collision factors
+        '''
+
+        Lmin, Lmax = 10**self.logL_edges[0], 10**self.logL_edges[-1] # min and max characteristic lengths
+        v = self.v[:,None,None] # collision velocity of each cell (km/s)
+        bin_masses = self.bin_masses[None,None,:,:]
+        # fragments per collision, indexed (cell, type, type) or (cell, type, L, chi)
+        self.yield_SS = calc_Ntot(calc_M_broadcast(self.m_sat[:,:,None], self.m_sat[:,None,:], v), Lmin, Lmax, 'coll')
+        self.yield_RR = calc_Ntot(calc_M_broadcast(self.m_rb[:,:,None], self.m_rb[:,None,:], v), Lmin, Lmax, 'coll')
+        self.yield_SN = calc_Ntot(calc_M_broadcast(self.m_sat[:,:,None,None], bin_masses, v[:,:,:,None]), Lmin, Lmax, 'coll')
+        self.yield_RN = calc_Ntot(calc_M_broadcast(self.m_rb[:,:,None,None], bin_masses, v[:,:,:,None]), Lmin, Lmax, 'coll')
+        # satellite-rocket collisions are simulated as each object having its own catastrophic collision
+        self.yield_S = calc_Ntot(self.m_sat, Lmin, Lmax, 'coll')
+        self.yield_R = calc_Ntot(self.m_rb, Lmin, Lmax, 'coll')
+        # fragments per explosion, indexed (cell, type)
+        self.yield_expl_S = calc_Ntot(0, Lmin, Lmax, 'expl', C=self.C_sat)
+        self.yield_expl_R = calc_Ntot(0, Lmin, Lmax, 'expl', C=self.C_rb)
+
+        # pair yields weighted by the collision factors, with the double-counted pairs removed
+        yield_SS_low = np.where(self.double_count_filter_sat, 0, self.yield_SS)
+        self.SS_yield_fac = yield_SS_low*self.SS_fac
+        self.SSd_yield_fac = self.yield_SS*self.SSd_fac
+        self.SD_yield_fac = self.yield_SS*self.SD_fac
+        self.DD_yield_fac = yield_SS_low*self.DD_fac
+        self.RR_yield_fac = np.where(self.double_count_filter_rb, 0, self.yield_RR)*self.RR_fac
+
+    def bind_params(self):
+        '''
+        points the parameters of each Cell at its view into the NCell parameter arrays
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s): None
+        '''
+
+        for i in range(self.num_cells):
+            cell = self.cells[i]
+            for key in self.sat_param_keys + self.rb_param_keys + self.debris_param_keys + self.coll_factor_keys:
+                setattr(cell, key, getattr(self, key)[i])
+
+    def __getstate__(self):
+        '''
+        returns the state of the NCell used for pickling/copying, with unused history space trimmed off
+
+        Input(s): None
+
+        Keyword Input(s): None
+
+        Output(s):
+        state : dictionary of the NCell's attributes
+
+        Note(s): tables shared by share_tables are sent by name, not by value
+        '''
+
+        state = self.__dict__.copy()
+        num_valid = self.time + 1
+        for key in ['t', 'S', 'S_d', 'D', 'R', 'N_bins', 'C_c', 'C_nc']:
+            state[key] = state[key][:num_valid]
+        state['hist_len'] = num_valid
+        if self.shared_tables is not None: # only send the names of the tables that are still shared
+            state['shared_tables'] = {attr : desc for attr, desc in self.shared_tables.items() if state[attr] is self.shared_views[attr]}
+            for attr in state['shared_tables']:
+                state[attr] = None
+        state['source_tables'] = None # re-attached if shared, otherwise re-built from the probability tables
+        state['table_blocks'], state['shared_views'] = {}, {}
+        return state
+
+    def __setstate__(self, state):
+        '''
+        restores the NCell from a pickled/copied state, re-attaching the Cells to the history arrays
+
+        Input(s):
+        state : dictionary of the NCell's attributes
+
+        Keyword Input(s): None
+
+        Output(s): None
+        '''
+
+        self.__dict__.update(state)
+        self.__dict__.setdefault('precor_state', None) # not in older pickles
+        if 'lupdate_t' not in self.__dict__ : self.lupdate_t = self.t[self.__dict__.pop('lupdate_time')]
+        self.__dict__.setdefault('backend', 'numpy')
+        self.__dict__.setdefault('dtype', np.dtype(np.double))
+        self.__dict__.setdefault('shared_tables', None)
+        self.__dict__.setdefault('shared_path', None)
+        self.__dict__.setdefault('source_tables', None)
+        self.table_blocks, self.shared_views = {}, {}
+        if self.shared_tables is not None : self.attach_tables()
+        if self.source_tables is None : self.setup_source_tables()
+        self.bind_history()
+        self.bind_params()
 
     def save(self, filepath, name, gap=0, force=True):
         '''
@@ -459,8 +940,9 @@ class NCell:
 
         Output(s): None
 
-        Note(s): drag_lifetime and events are lost. adherence to the "gap" value is approximate, and may behave
-        strangely if the time step is close to the gap size.
+        Note(s): adherence to the "gap" value is approximate, and may behave strangely if the time step is close to
+        the gap size. the simulation can only be continued exactly from the saved data if the last time is kept
+        (see save_state), and checkpoint only re-writes the new data when saving the same run repeatedly
         '''
 
         true_path = filepath + name + '/'
@@ -486,16 +968,16 @@ class NCell:
             write_maxdt = -1
         else:
             write_maxdt = self.max_dt
-        if self.dt_max == np.inf:
+        if self.t_max == np.inf:
             write_tmax = -1
         else:
-            write_tmax = self.dt_max
+            write_tmax = self.t_max
         csv_writer.writerow([self.num_L, self.num_chi, self.num_cells, self.num_dir, self.min_lifetime, self.CD,
                              self.m0, self.min_dt, write_maxdt, self.dtfactor, write_tmax, write_F])
         csv_file.close()
 
         # write easy arrays
-        t_arr = np.array(self.t)
+        t_arr = self.t[:self.time+1]
         filter = np.full(t_arr.shape, False) # build filter based on time steps
         filter_len = 0 # number of Trues in the filter
         if t_arr.size > 0:
@@ -512,8 +994,13 @@ class NCell:
         np.savez_compressed(true_path + "data.npz", **to_save)
         
         # save probability tables
-        to_save = {'sat_coll_tables' : self.sat_coll_probability_tables, 'sat_expl_tables' : self.sat_expl_probability_tables,
-                   'rb_coll_tables' : self.rb_coll_probability_tables, 'rb_expl_tables' : self.rb_expl_probability_tables}
+        to_save = {}
+        for key, attr in self.prob_table_keys.items():
+            table = getattr(self, attr)
+            if self.sparse_tables: # save the compressed sparse row components
+                to_save[key + '_data'], to_save[key + '_indices'], to_save[key + '_indptr'] = table.data, table.indices, table.indptr
+            else:
+                to_save[key] = table
         np.savez_compressed(true_path + "prob_tables.npz", **to_save)
 
         # save the Cells
@@ -522,6 +1009,80 @@ class NCell:
             os.mkdir(cell_path)
             self.cells[i].save(cell_path, filter, filter_len)
 
+        # save what's needed to continue the simulation, if the last time is kept
+        if filter[-1]:
+            self.save_state(true_path)
+
+    def save_state(self, true_path):
+        '''
+        saves everything beyond the history and parameters needed to continue the simulation exactly as it would
+        have run, i.e. the current drag lifetimes, integrator state, and the remaining discrete events
+
+        Input(s):
+        true_path : explicit path to the folder the NCell is saved in (string)
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): the events are pickled, so any Event subclasses used must be importable when loading
+        '''
+
+        np.savez_compressed(true_path + "state.npz", lupdate_t=self.lupdate_t, update_period=self.update_period,
+                            upper_N=self.upper_N, tau_sat=self.tau_sat, tau_rb=self.tau_rb, tau_N=self.tau_N,
+                            dtype=self.dtype.name, backend=self.backend)
+        with open(true_path + "events.pkl", 'wb') as event_file:
+            pickle.dump([cell.event_list for cell in self.cells], event_file)
+
+        # save the predictor-corrector state, if it's for the current time
+        state = self.precor_state
+        if state is not None and state['t'] == self.t[self.time]:
+            np.savez_compressed(true_path + "precor_state.npz", t=state['t'], dt_old=state['dt_old'], dt=state['dt'],
+                                epsilon_old=state['epsilon_old'], rates_n=np.concatenate([np.ravel(rate) for rate in state['rates_n']]),
+                                rates_n1=np.concatenate([np.ravel(rate) for rate in state['rates_n1']]))
+        elif os.path.exists(true_path + "precor_state.npz"):
+            os.remove(true_path + "precor_state.npz")
+
+    def checkpoint(self, filepath, name):
+        '''
+        saves the current NCell object in the same format as save, only writing the time steps added since the
+        last checkpoint of this run
+
+        Input(s):
+        filepath : explicit path to folder that the files will be saved in (string)
+        name : name of the object, must be a valid unix folder name (string)
+
+        Keyword Input(s): None
+
+        Output(s): None
+
+        Note(s): the first checkpoint (or one after the saved history no longer matches this NCell) does a full
+        save. after that, the new time steps are written to a new history<k>.npz file, starting from the last
+        saved time in case it was changed, and the state needed to continue the simulation is re-written. all
+        time steps are kept, use the record_every option of the run methods to thin them out
+        '''
+
+        true_path = filepath + name + '/'
+        num_saved, num_chunks = 0, 0
+        if os.path.exists(true_path + 'checkpoint.npz'):
+            check_dict = np.load(true_path + 'checkpoint.npz')
+            num_saved, num_chunks = int(check_dict['num_saved']), int(check_dict['num_chunks'])
+            # the last saved time can be overwritten by a step that isn't recorded (see record_steps), but not the one before
+            check = max(num_saved - 2, 0)
+            if num_saved - 1 > self.time or self.t[check] != check_dict['t_check'] : num_saved = 0 # a different run
+        if num_saved == 0:
+            self.save(filepath, name, force=True)
+        else:
+            start = num_saved - 1
+            to_save = {'start' : start}
+            for key in ['t', 'S', 'S_d', 'D', 'R', 'N_bins', 'C_c', 'C_nc']:
+                to_save[key] = getattr(self, key)[start:self.time+1]
+            np.savez_compressed(true_path + "history" + str(num_chunks) + ".npz", **to_save)
+            num_chunks += 1
+            self.save_state(true_path)
+        np.savez_compressed(true_path + "checkpoint.npz", num_saved=self.time+1, num_chunks=num_chunks,
+                            t_check=self.t[max(self.time - 1, 0)])
+
     def load(filepath):
         '''
         builds an NCell object from saved data
@@ -534,7 +1095,9 @@ class NCell:
         Output(s):
         atmos : NCell object build from loaded data
 
-        Note(s): atmos will not have events
+        Note(s): if the data was saved with its last time kept (see save_state), atmos has the same drag lifetimes,
+        events, integrator state, and floating point type as the saved NCell, and continues the simulation exactly.
+        otherwise, atmos will not have events, and uses double precision (see set_dtype)
         '''
 
         atmos = NCell.__new__(NCell) # empty initialization
@@ -564,13 +1127,12 @@ class NCell:
         array_dict = np.load(filepath + 'data.npz')
         atmos.alts = array_dict['alts']
         atmos.dhs = array_dict['dhs']
-        atmos.t = array_dict['t'].tolist()
+        atmos.t = array_dict['t']
         atmos.time = len(atmos.t) - 1 # set time to the end of the data
-        atmos.lupdate_time = atmos.time
+        atmos.lupdate_t = atmos.t[atmos.time]
         atmos.logL_edges = array_dict['logL']
         atmos.chi_edges = array_dict['chi']
         atmos.lam_sat = array_dict['lam_sat']
-        atmos.num_cells = len(atmos.alts) - 1
         atmos.num_sat_types = len(atmos.lam_sat)
 
         # compute related parameters
@@ -590,10 +1152,14 @@ class NCell:
 
         # load in probability tables
         prob_dict = np.load(filepath + "prob_tables.npz")
-        atmos.sat_coll_probability_tables = prob_dict['sat_coll_tables']
-        atmos.rb_coll_probability_tables = prob_dict['rb_coll_tables']
-        atmos.sat_expl_probability_tables = prob_dict['sat_expl_tables']
-        atmos.rb_expl_probability_tables = prob_dict['rb_expl_tables']
+        atmos.sparse_tables = 'sat_coll_tables' not in prob_dict # keep the tables in the format they were saved in
+        atmos.table_cutoff = 0
+        atmos.backend = 'numpy'
+        atmos.dtype = np.dtype(np.double)
+        atmos.shared_tables, atmos.shared_path = None, None
+        atmos.table_blocks, atmos.shared_views = {}, {}
+        atmos.load_prob_tables(prob_dict)
+        atmos.setup_source_tables()
 
         # get Cells
         atmos.cells = []
@@ -601,243 +1167,848 @@ class NCell:
             cell_path = filepath + "cell" + str(i) + "/"
             atmos.cells.append(Cell.load(cell_path))
         atmos.num_rb_types = len(atmos.cells[0].m_rb)
+        atmos.setup_history(len(atmos.t))
+        atmos.setup_params()
+
+        # add time steps saved by checkpoint
+        num_chunks = 0
+        if os.path.exists(filepath + 'checkpoint.npz'):
+            num_chunks = int(np.load(filepath + 'checkpoint.npz')['num_chunks'])
+        for k in range(num_chunks):
+            chunk_dict = np.load(filepath + 'history' + str(k) + '.npz')
+            start, num_t = int(chunk_dict['start']), len(chunk_dict['t'])
+            atmos.time = start - 1
+            atmos.grow_history(start + num_t)
+            for key in ['t', 'S', 'S_d', 'D', 'R', 'N_bins', 'C_c', 'C_nc']:
+                getattr(atmos, key)[start:start+num_t] = chunk_dict[key]
+            atmos.time = start + num_t - 1
+        atmos.lupdate_t = atmos.t[atmos.time]
+
+        # load the state needed to continue the simulation, if there is one
+        atmos.update_period = 1/12
+        atmos.upper_N = np.zeros((atmos.num_L, atmos.num_chi))
+        if os.path.exists(filepath + 'state.npz'):
+            state_dict = np.load(filepath + 'state.npz')
+            if 'lupdate_t' in state_dict : atmos.lupdate_t = float(state_dict['lupdate_t'])
+            else : atmos.lupdate_t = atmos.t[int(state_dict['lupdate_time'])] # saved as an index by older versions
+            atmos.update_period = float(state_dict['update_period'])
+            atmos.upper_N = state_dict['upper_N']
+            atmos.tau_sat[:], atmos.tau_rb[:], atmos.tau_N[:] = state_dict['tau_sat'], state_dict['tau_rb'], state_dict['tau_N']
+            atmos.backend = str(state_dict['backend'])
+            if atmos.backend == 'numba' and not numba_available : atmos.backend = 'numpy'
+            if str(state_dict['dtype']) != atmos.dtype.name : atmos.set_dtype(np.dtype(str(state_dict['dtype'])))
+        if os.path.exists(filepath + 'events.pkl'):
+            with open(filepath + 'events.pkl', 'rb') as event_file:
+                event_lists = pickle.load(event_file)
+            for cell, event_list in zip(atmos.cells, event_lists):
+                cell.event_list = event_list
+
+        # load the predictor-corrector state, if there is one
+        atmos.precor_state = None
+        if os.path.exists(filepath + 'precor_state.npz'):
+            state_dict = np.load(filepath + 'precor_state.npz')
+            atmos.precor_state = {'t' : float(state_dict['t']), 'dt_old' : float(state_dict['dt_old']),
+                                  'dt' : float(state_dict['dt']), 'epsilon_old' : float(state_dict['epsilon_old']),
+                                  'rates_n' : atmos.split_state(state_dict['rates_n']),
+                                  'rates_n1' : atmos.split_state(state_dict['rates_n1'])}
 
         return atmos
 
-    def dxdt(self, time, upper):
+    def dxdt_cells(self, time):
         '''
-        calculates the rates of change of all parameters at the given time
+        calculates the in-cell rates of Cell.dxdt_cell for every cell at once, using the stacked NCell
+        parameter arrays
 
         Parameter(s):
         time : time (index) of the values to be used
-        upper : whether or not to have debris come into the top shell (bool)
 
         Keyword Parameter(s): None
 
         Output(s):
-        dSdt : list of rates of change in S for each cell (1/yr)
-        dS_ddt : list of rates of change in S_d for each cell (1/yr)
-        dDdt : list of rates of change in D for each cell (1/yr)
-        dRdt : list of rates of change in R for each cell (1/yr)
-        dNdt : list of rates of change in the N matrix for each cell (1/yr)
-        dCcdt : list of rates of change in C_c for each cell (1/yr)
-        dCcldt : list of rates of change in C_nc for each cell (1/yr)
+        dSdt : rate of change of S in each cell due only to processes within the cell (2-d array, 1/yr)
+        dS_ddt : rate of change of S_d in each cell due only to processes within the cell (2-d array, 1/yr)
+        dDdt : rate of change of D in each cell due only to processes within the cell (2-d array, 1/yr)
+        dRdt : rate of change of R in each cell due only to processes within the cell (2-d array, 1/yr)
+        S_out : rate of satellites ascending from each cell (2-d array, 1/yr)
+        S_dout : rate of satellites de-orbiting from each cell (2-d array, 1/yr)
+        D_out : rate of derelicts decaying from each cell (2-d array, 1/yr)
+        R_out : rate of rocket bodies decaying from each cell (2-d array, 1/yr)
+        N_out : rate of debris decaying from each bin of each cell (3-d array, 1/yr)
+        C_pair : total rate of collisions between satellites and/or rocket bodies in each cell (array, 1/yr)
+        N_pair : rate of debris creation from collisions between satellites and/or rocket bodies in each cell
+                 (array, 1/yr)
+        CS_dt : rate of collisions between each debris bin and satellite type in each cell (4-d array, 1/yr)
+        CR_dt : rate of collisions between each debris bin and rocket type in each cell (4-d array, 1/yr)
+        expl_S : rate of explosions for satellites of each type in each cell (2-d array, 1/yr)
+        expl_R : rate of explosions for rocket bodies of each type in each cell (2-d array, 1/yr)
+
+        Note(s): see dxdt_cells_values. the first index of every output is the cell, the rest are as in Cell.dxdt_cell. the per-type
+        collision totals are computed without building the (type, type) collision rates, use pair_colls if
+        those are needed. the debris from collisions with debris is not included in N_pair
+        '''
 
-        Note : does not check that the time input is valid
-        '''
-
-        top_cell = self.cells[-1]
-        top_Nin = self.upper_N/top_cell.tau_N # debris going into top cell
-        dSdt = np.zeros((self.num_cells, self.num_sat_types)) # array of changes in satallite values
-        dS_ddt = np.zeros((self.num_cells, self.num_sat_types)) # array of changes in de-orbiting values
-        dDdt = np.zeros((self.num_cells, self.num_sat_types)) # array of changes in derelict values
-        dRdt = np.zeros((self.num_cells, self.num_rb_types)) # array of changes in rocket body values
-        dNdt =  np.zeros((self.num_cells, self.num_L, self.num_chi)) # array of changes in debris values
-        sat_coll =  np.zeros((self.num_cells, self.num_sat_types, self.num_sat_types)) # array of satellite-satellite collisions
-        RS_coll = np.zeros((self.num_cells, self.num_sat_types, self.num_rb_types)) # array of rocket-satellite collisions
-        R_coll = np.zeros((self.num_cells, self.num_rb_types, self.num_rb_types)) # array of rocket-rocket collisions
-        NS_coll = np.zeros((self.num_cells, self.num_sat_types, self.num_L, self.num_chi)) # array of collision values for satellites
-        NR_coll = np.zeros((self.num_cells, self.num_rb_types, self.num_L, self.num_chi)) # array of collision values for rockets
-        NS_expl = np.zeros((self.num_cells, self.num_sat_types)) # array of explosion values for satellites
-        NR_expl = np.zeros((self.num_cells, self.num_rb_types)) # array of explosion values for rockets
-
-        # get initial D_in, N_in values
-        S_in = np.zeros((self.num_cells+1, self.num_sat_types))
-        S_in[0,:] = self.lam_sat
-        S_din = np.zeros((self.num_cells+1, self.num_sat_types))
-        D_in = np.zeros((self.num_cells+1, self.num_sat_types))
-        R_in = np.zeros((self.num_cells+1, self.num_rb_types))
-        N_in  = np.zeros((self.num_cells+1, self.num_L, self.num_chi))
-        if upper : N_in[-1,:,:] = top_Nin
-
-        # iterate through cells, from top to bottom
-        for i in range(self.num_cells):
-            curr_cell = self.cells[i]
-            dSdt[i,:], dS_ddt[i,:], dDdt[i,:], dRdt[i,:], S_in[i+1,:], S_din[i,:], D_in[i,:], R_in[i,:], N_in[i,:,:], sat_coll[i,:,:], RS_coll[i,:,:], R_coll[i,:,:], NS_coll[i,:,:,:], NR_coll[i,:,:,:], NS_expl[i,:], NR_expl[i,:] = curr_cell.dxdt_cell(time)
-            # simulate collisions and explosions
-            self.sim_colls(dNdt, sat_coll[i,:,:], curr_cell.m_sat, curr_cell.m_sat, i, 'sat') # sat-sat
-            self.sim_colls_satrb(dNdt, RS_coll[i,:,:], curr_cell.m_sat, i, 'sat') # sat-rb
-            self.sim_colls_satrb(dNdt, RS_coll[i,:,:], curr_cell.m_rb, i, 'rb') # sat-rb
-            self.sim_colls(dNdt, NS_coll[i,:,:,:], curr_cell.m_sat, self.bin_masses, i, 'sat') # sat-debris
-            self.sim_expl(dNdt, NS_expl, curr_cell.C_sat, i, 'sat') # sat explosions
-            self.sim_colls(dNdt, R_coll[i,:,:], curr_cell.m_rb, curr_cell.m_rb, i, 'rb') # rb-rb
-            self.sim_colls(dNdt, NR_coll[i,:,:,:], curr_cell.m_rb, self.bin_masses, i, 'rb') # rb-debris
-            self.sim_expl(dNdt, NR_expl, curr_cell.C_sat, i, 'rb') # rb explosions
-                    
-            # add on debris lost to collisions
-            if self.num_sat_types != 0:
-                dNdt[i,:,:] -= np.sum(NS_coll[i,:,:,:], axis=0)
-            if self.num_rb_types != 0:
-                dNdt[i,:,:] -= np.sum(NR_coll[i,:,:,:], axis=0)
-
-        # go through cells from bottom to top to correct values
-        for i in range(self.num_cells):
-            dSdt[i] += S_in[i,:] - S_in[i+1,:]
-            dS_ddt[i] += S_din[i+1,:] - S_din[i,:]
-            dDdt[i] += D_in[i+1,:] - D_in[i,:]
-            dRdt[i] += R_in[i+1,:] - R_in[i,:]
-            dNdt[i] += N_in[i+1,:] - N_in[i,:]
+        return self.dxdt_cells_values(self.S[time], self.S_d[time], self.D[time], self.R[time], self.N_bins[time])
 
-        # update values
-        dCcdt = np.sum(sat_coll, axis=(1,2)) + np.sum(RS_coll, axis=(1,2)) + np.sum(R_coll, axis=(1,2))
-        dCncdt = np.zeros(self.num_cells)
-        for i in range(self.num_cells):
-            curr_cell = self.cells[i]
-            dCcdt[i] += np.sum(NS_coll[i,:,:,:][curr_cell.cat_sat_N]) + np.sum(NR_coll[i,:,:,:][curr_cell.cat_rb_N])
-            dCncdt[i] += np.sum(NS_coll[i,:,:,:][curr_cell.cat_sat_N==False]) + np.sum(NR_coll[i,:,:,:][curr_cell.cat_rb_N==False])
+    def dxdt_cells_values(self, S_loc, Sd_loc, D_loc, R_loc, N_loc):
+        '''
+        calculates the in-cell rates of dxdt_cells from the given values
 
-        return dSdt, dS_ddt, dDdt, dRdt, dNdt, dCcdt, dCncdt
+        Parameter(s):
+        S_loc : number of live satellites of each type in each cell (array, indexed (..., cell, type))
+        Sd_loc : number of de-orbiting satellites of each type in each cell (array, indexed (..., cell, type))
+        D_loc : number of derelict satellites of each type in each cell (array, indexed (..., cell, type))
+        R_loc : number of rocket bodies of each type in each cell (array, indexed (..., cell, type))
+        N_loc : binned amount of debris in each cell (array, indexed (..., cell, L, chi))
+
+        Keyword Parameter(s): None
+
+        Output(s): same as dxdt_cells, with the leading axes of the values
 
-    def run_sim_euler(self, T, dt=1, upper=True):
+        Note(s): the values can have leading (i.e. scenario) axes, as can the parameters, as long as they
+        broadcast against each other (see NCellEnsemble)
         '''
-        simulates the evolution of the debris-satallite system for T years using a Euler method
+
+        # handle satellite-debris collisions, indexed (cell, type, L, chi)
+        alphaN_L = self.alphaN_L[...,None]
+        dSdt = N_loc[...,None,:,:]*(self.NS_fac*S_loc)[...,None,None]*alphaN_L # collisions with live satallites
+        dS_ddt = N_loc[...,None,:,:]*(self.NS_fac*Sd_loc)[...,None,None]*alphaN_L # collisions with de-orbiting satellites
+        dDdt = N_loc[...,None,:,:]*(self.NS_fac*D_loc)[...,None,None] # collisions with derelict satellites
+
+        # calculate satellite-satellite collision totals for each type, indexed (cell, type). XY_tot is the sum
+        # over the other object's type of the corresponding (type, type) rate, XY_diag is its diagonal
+        s, rs = self.sigma_sat_km, self.sqrt_sigma_sat_km
+        f, f_v = self.coll_scale[:,None], self.coll_scale_v[:,None]
+        aSS, aSSd = self.alpha_S*S_loc, self.alpha_S*Sd_loc
+        comb_S, comb_Sd = comb_sum(s, rs, s, rs, aSS), comb_sum(s, rs, s, rs, aSSd)
+        SS_tot, SS_diag = f*aSS*comb_S, 4*f*s*aSS**2
+        SSd_tot, SSd_tot2 = f_v*aSSd*comb_S, f_v*aSS*comb_Sd # sums for the de-orbiting and live satellites
+        SD_tot = f*D_loc*comb_sum(s, rs, s, rs, self.alpha_D*S_loc)
+        SdSd_tot, SdSd_diag = f*aSSd*comb_Sd, 4*f*s*aSSd**2
+        SdD_tot = f*D_loc*comb_sum(s, rs, s, rs, self.alpha_D*Sd_loc)
+        DD_tot, DD_diag = f*D_loc*comb_sum(s, rs, s, rs, D_loc), 4*f*s*D_loc**2 # collisions cannot be avoided
+
+        # calculate collisions between satellites and rocket bodies, summed over rocket types
+        r, rr = self.sigma_rb_km, self.sqrt_sigma_rb_km
+        comb_R = comb_sum(s, rs, r, rr, R_loc)
+        SR_tot = f*self.alpha_R*S_loc*comb_R
+        SdR_tot = f*self.alpha_R*Sd_loc*comb_R
+        DR_tot = f*D_loc*comb_R # collisions cannot be avoided
+        RS_tot = f*R_loc*comb_sum(r, rr, s, rs, self.alpha_R*(S_loc + Sd_loc) + D_loc) # summed over satellite types
+
+        # compute explosion rates for satellites
+        expl_S = self.expl_rate_L*S_loc/100
+        expl_Sd = self.expl_rate_L*Sd_loc/100
+        expl_D = self.expl_rate_D*D_loc/100
+
+        # compute decay/ascend events for satellites
+        kill_S, deorbit_S, decay_D = S_loc/self.del_t, Sd_loc/self.tau_do, D_loc/self.tau_sat
+        kill_S[...,self.ascending] = S_loc[...,self.ascending]/self.fail_t[self.ascending]
+        ascend_S = np.zeros(S_loc.shape)
+        ascend_S[...,self.ascending] = S_loc[...,self.ascending]/self.up_time[self.ascending]
+
+        # sum everything up, diagonals are to account for objects of the same type colliding
+        cat_sat, cat_rb = self.cat_sat_N, self.cat_rb_N
+        dSdt_tot = 0 - kill_S - np.sum(dSdt, axis=(-2,-1)) - SS_tot - SSd_tot - SD_tot - SS_diag - SR_tot - expl_S
+        dS_ddt_tot = self.P*kill_S - np.sum(dS_ddt, axis=(-2,-1)) - SSd_tot2 - SdSd_tot - SdD_tot - SdSd_diag - SdR_tot - expl_Sd
+        dDdt_tot = (1-self.P)*kill_S - np.sum(dDdt, axis=(-2,-1), where=cat_sat) + np.sum(dSdt, axis=(-2,-1), where=cat_sat==False) + np.sum(dDdt, axis=(-2,-1), where=cat_sat==False) - SD_tot - SdD_tot - DD_tot - DD_diag - DR_tot - expl_D
+        CS_dt = dSdt + dS_ddt + dDdt # total collisions between satellites and debris
+
+        # handle rocket-debris and rocket-rocket collisions
+        dRdt = N_loc[...,None,:,:]*(self.NR_fac*R_loc)[...,None,None]
+        RR_tot, RR_diag = f*R_loc*comb_sum(r, rr, r, rr, R_loc), 4*f*r*R_loc**2
+
+        # handle rocket explosions, decays
+        expl_R = self.expl_rate_R*R_loc/100
+        decay_R = R_loc/self.tau_rb
+
+        # sum everything up
+        dRdt_tot = self.lam_rb - np.sum(dRdt, axis=(-2,-1), where=cat_rb) - RR_tot - RR_diag - RS_tot - expl_R
+
+        # calculate decay rates for debris
+        decay_N = N_loc/self.tau_N[:,None,:]
+
+        # total pair collision rates, same-population rates are symmetric so only the lower triangle (half the
+        # total plus half the diagonal) is counted to avoid double-counting
+        SR_row = SR_tot + SdR_tot + DR_tot
+        C_pair = (np.sum(SS_tot + SS_diag + SdSd_tot + SdSd_diag + DD_tot + DD_diag, axis=-1) + np.sum(RR_tot + RR_diag, axis=-1))/2
+        C_pair += np.sum(SSd_tot + SD_tot + SdD_tot + SR_row, axis=-1)
+
+        # debris from pair collisions, using the yield tables weighted by the collision factors
+        N_pair = np.einsum('...i,...ij,...j->...', S_loc, self.SS_yield_fac, S_loc) + np.einsum('...i,...ij,...j->...', Sd_loc, self.SS_yield_fac, Sd_loc)
+        N_pair += np.einsum('...i,...ij,...j->...', Sd_loc, self.SSd_yield_fac, S_loc) + np.einsum('...i,...ij,...j->...', D_loc, self.SD_yield_fac, S_loc + Sd_loc)
+        N_pair += np.einsum('...i,...ij,...j->...', D_loc, self.DD_yield_fac, D_loc) + np.einsum('...i,...ij,...j->...', R_loc, self.RR_yield_fac, R_loc)
+        N_pair += np.sum(self.yield_S*SR_row, axis=-1) + np.sum(self.yield_R*RS_tot, axis=-1)
+
+        expl_S_tot = expl_S + expl_Sd + expl_D
+
+        return dSdt_tot, dS_ddt_tot, dDdt_tot, dRdt_tot, ascend_S, deorbit_S, decay_D, decay_R, decay_N, C_pair, N_pair, CS_dt, dRdt, expl_S_tot, expl_R
+
+    def pair_colls(self, time):
+        '''
+        calculates the collision rates between each pair of satellite and/or rocket body types in every cell
 
         Parameter(s):
-        T : length of the simulation (yr)
+        time : time (index) of the values to be used
 
-        Keyword Parameter(s):
-        dt : timestep used by the simulation (yr, default 1yr)
-        upper : whether or not to have debris come into the top shell (bool, default True)
+        Keyword Parameter(s): None
 
-        Output(s): None
+        Output(s):
+        D_dt : rate of collisions between satellites in each cell (3-d array, 1/yr)
+        RD_dt : rate of collisions between satellites and rocket bodies in each cell (3-d array, 1/yr)
+        R_dt : rate of collisions between rocket bodies in each cell (3-d array, 1/yr)
+
+        Note(s): the first index of every output is the cell, the rest are as in Cell.dxdt_cell. this builds
+        the full (type, type) arrays, so is only meant for when pair-resolved rates are needed
         '''
 
-        self.sim_events() # run initial discrete events
+        S_loc, Sd_loc, D_loc, R_loc = self.S[time], self.S_d[time], self.D[time], self.R[time]
 
-        while self.t[self.time] < T:
-            if (self.t[self.time] - self.t[self.lupdate_time]) >= self.update_period:
-                    self.update_lifetimes(self.t[self.time])
-                    self.lupdate_time = self.time
-            dSdt, dS_ddt, dDdt, dRdt, dNdt, dCcdt, dCncdt = self.dxdt(self.time, upper) # get current rates of change
+        # calculate satellite-satellite collision rates, indexed (cell, type, type)
+        S1, S2 = S_loc[:,None,:], S_loc[:,:,None]
+        S_d1, S_d2 = Sd_loc[:,None,:], Sd_loc[:,:,None]
+        D1, D2 = D_loc[:,None,:], D_loc[:,:,None]
+        dSSdt = self.SS_fac*S1*S2
+        dSS_ddt = self.SSd_fac*S1*S_d2
+        dSDdt = self.SD_fac*S1*D2
+        dS_dS_ddt = self.SS_fac*S_d1*S_d2
+        dS_dDdt = self.SD_fac*S_d1*D2
+        dDDdt = self.DD_fac*D1*D2  # collisions cannot be avoided
 
-            for i in range(self.num_cells): # iterate through cells and update values
-                curr_cell = self.cells[i]
-                curr_cell.S.append(curr_cell.S[self.time] + dSdt[i]*dt)
-                curr_cell.S_d.append(curr_cell.S_d[self.time] + dS_ddt[i]*dt)
-                curr_cell.D.append(curr_cell.D[self.time] + dDdt[i]*dt)
-                curr_cell.R.append(curr_cell.R[self.time] + dRdt[i]*dt)
-                curr_cell.N_bins.append(curr_cell.N_bins[self.time] + dNdt[i]*dt)
-                curr_cell.C_c.append(curr_cell.C_c[self.time] + dCcdt[i]*dt)
-                curr_cell.C_nc.append(curr_cell.C_nc[self.time] + dCncdt[i]*dt)
-            self.t.append(self.t[self.time] + dt) # update time
-            self.time += 1
-            self.sim_events() # run discrete events
+        # calculate collisions between satellites and rocket bodies, indexed (cell, satellite, rocket)
+        R2 = R_loc[:,None,:]
+        dSRdt = self.SR_fac*S_loc[:,:,None]*R2
+        dS_dRdt = self.SR_fac*Sd_loc[:,:,None]*R2
+        dDRdt = self.DR_fac*D_loc[:,:,None]*R2 # collisions cannot be avoided
+        dRRdt = self.RR_fac*R_loc[:,None,:]*R_loc[:,:,None]
 
-    def run_sim_precor(self, T, dt_i=1, dt_min=0, dt_max=1, tolerance=1, err_factor=1e-6, upper=True):
-        ''' TODO
-        simulates the evolution of the debris-satallite system for T years using predictor-corrector model
+        # set values to zero to avoid double-counting
+        dSSdt[:,self.double_count_filter_sat], dS_dS_ddt[:,self.double_count_filter_sat], dDDdt[:,self.double_count_filter_sat] = 0, 0, 0
+        dRRdt[:,self.double_count_filter_rb] = 0
 
-        Parameter(s):
-        T : length of the simulation (yr)
+        D_dt = dSSdt + dSS_ddt + dSDdt + dS_dS_ddt + dS_dDdt + dDDdt
+        RD_dt = dSRdt + dS_dRdt + dDRdt
 
-        Keyword Parameter(s):
-        dt_i : initial timestep used by the simulation (yr, default 1)
-        dt_min : minimum time step used by the simulation is (yr, default 0)
+        return D_dt, RD_dt, dRRdt
+
+    def dxdt(self, time, upper):
+        '''
+        calculates the rates of change of all parameters at the given time
+
+        Parameter(s):
+        time : time (index) of the values to be used
+        upper : whether or not to have debris come into the top shell (bool)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        dSdt : list of rates of change in S for each cell (1/yr)
+        dS_ddt : list of rates of change in S_d for each cell (1/yr)
+        dDdt : list of rates of change in D for each cell (1/yr)
+        dRdt : list of rates of change in R for each cell (1/yr)
+        dNdt : list of rates of change in the N matrix for each cell (1/yr)
+        dCcdt : list of rates of change in C_c for each cell (1/yr)
+        dCcldt : list of rates of change in C_nc for each cell (1/yr)
+
+        Note : does not check that the time input is valid, see dxdt_values
+        '''
+
+        return self.dxdt_values(self.S[time], self.S_d[time], self.D[time], self.R[time], self.N_bins[time], upper)
+
+    def dxdt_values(self, S, S_d, D, R, N, upper):
+        '''
+        calculates the rates of change of dxdt from the given values
+
+        Parameter(s):
+        S : number of live satellites of each type in each cell (array, indexed (..., cell, type))
+        S_d : number of de-orbiting satellites of each type in each cell (array, indexed (..., cell, type))
+        D : number of derelict satellites of each type in each cell (array, indexed (..., cell, type))
+        R : number of rocket bodies of each type in each cell (array, indexed (..., cell, type))
+        N : binned amount of debris in each cell (array, indexed (..., cell, L, chi))
+        upper : whether or not to have debris come into the top shell (bool)
+
+        Keyword Parameter(s): None
+
+        Output(s): same as dxdt, with the leading axes of the values
+
+        Note(s): the values and parameters can have leading (i.e. scenario) axes, see dxdt_cells_values
+        '''
+
+        # get the in-cell rates for all cells at once
+        dSdt, dS_ddt, dDdt, dRdt, S_out, S_dout, D_out, R_out, N_out, C_pair, N_pair, NS_coll, NR_coll, NS_expl, NR_expl = self.dxdt_cells_values(S, S_d, D, R, N)
+
+        # simulate collisions and explosions
+        # sat-sat, sat-rb, sat-debris, rb-rb and rb-debris debris all use the satellite collision tables
+        N_coll = N_pair + np.sum(self.yield_SN*NS_coll, axis=(-3,-2,-1)) + np.sum(self.yield_RN*NR_coll, axis=(-3,-2,-1))
+        N_expl_sat = np.sum(self.yield_expl_S*NS_expl, axis=-1)
+        N_expl_rb = np.sum(self.yield_expl_R*NR_expl, axis=-1)
+        N_src = np.concatenate((N_coll, N_expl_sat, N_expl_rb), axis=-1) # debris creation rate of each source in each cell
+        if self.sparse_tables: # distribute between cells
+            dNdt = (self.source_tables @ N_src.astype(self.dtype).T).T.reshape(N_out.shape)
+        else:
+            dNdt = (N_src.astype(self.dtype) @ self.source_tables).reshape(N_out.shape)
+
+        # add on debris lost to collisions
+        dNdt -= np.sum(NS_coll, axis=-3) + np.sum(NR_coll, axis=-3)
+
+        # add flows between cells, S_in[i] is the flow from below into cell i
+        S_in = np.concatenate((np.broadcast_to(self.lam_sat[...,None,:], S_out[...,:1,:].shape), S_out), axis=-2) # launches come in from the bottom
+        dSdt += S_in[...,:-1,:] - S_in[...,1:,:]
+        dS_ddt += np.concatenate((S_dout[...,1:,:], np.zeros(S_dout[...,:1,:].shape)), axis=-2) - S_dout
+        dDdt += np.concatenate((D_out[...,1:,:], np.zeros(D_out[...,:1,:].shape)), axis=-2) - D_out
+        dRdt += np.concatenate((R_out[...,1:,:], np.zeros(R_out[...,:1,:].shape)), axis=-2) - R_out
+        N_in = np.zeros(N_out.shape) # debris coming in from above
+        N_in[...,:-1,:,:] = N_out[...,1:,:,:]
+        if upper : N_in[...,-1,:,:] = self.upper_N/self.tau_N[-1] # debris going into top cell
+        dNdt += N_in - N_out
+
+        # update values
+        dCcdt = C_pair + np.sum(NS_coll, axis=(-3,-2,-1), where=self.cat_sat_N) + np.sum(NR_coll, axis=(-3,-2,-1), where=self.cat_rb_N)
+        dCncdt = np.sum(NS_coll, axis=(-3,-2,-1), where=self.cat_sat_N==False) + np.sum(NR_coll, axis=(-3,-2,-1), where=self.cat_rb_N==False)
+
+        return dSdt, dS_ddt, dDdt, dRdt, dNdt, dCcdt, dCncdt
+
+    def get_state(self, time):
+        '''
+        packs the values at the given time into a single state vector
+
+        Parameter(s):
+        time : time (index) of the values to be used
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        x : S, S_d, D, R, N, C_c, and C_nc of every cell, flattened and concatenated in that order (array)
+        '''
+
+        return np.concatenate((self.S[time].ravel(), self.S_d[time].ravel(), self.D[time].ravel(), self.R[time].ravel(),
+                               self.N_bins[time].ravel(), self.C_c[time], self.C_nc[time]))
+
+    def set_state(self, time, x):
+        '''
+        sets the values at the given time from a state vector
+
+        Parameter(s):
+        time : time (index) of the values to be set
+        x : state vector, in the format given by get_state (array)
+
+        Keyword Parameter(s): None
+
+        Output(s): None
+
+        Note(s): does not check that the time input is valid, or lengthen the history
+        '''
+
+        self.S[time], self.S_d[time], self.D[time], self.R[time], self.N_bins[time], self.C_c[time], self.C_nc[time] = self.split_state(x)
+
+    def split_state(self, x):
+        '''
+        splits a state vector (or a vector of rates of change) back into arrays for each value
+
+        Parameter(s):
+        x : state vector, in the format given by get_state (array)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        S, S_d, D, R, N, C_c, C_nc : values in the format of one time of the history arrays (arrays, views into x)
+        '''
+
+        num_sat, num_rb = self.num_cells*self.num_sat_types, self.num_cells*self.num_rb_types
+        num_N = self.num_cells*self.num_L*self.num_chi
+        end = 3*num_sat + num_rb + num_N
+        return (x[:num_sat].reshape(self.S.shape[1:]), x[num_sat:2*num_sat].reshape(self.S.shape[1:]),
+                x[2*num_sat:3*num_sat].reshape(self.S.shape[1:]), x[3*num_sat:3*num_sat+num_rb].reshape(self.R.shape[1:]),
+                x[3*num_sat+num_rb:end].reshape(self.N_bins.shape[1:]), x[end:end+self.num_cells],
+                x[end+self.num_cells:end+2*self.num_cells])
+
+    def dxdt_state(self, x, upper=True, out=None):
+        '''
+        calculates the rates of change for an arbitrary state vector, using the current lifetimes
+
+        Parameter(s):
+        x : state vector, in the format given by get_state (array)
+
+        Keyword Parameter(s):
+        upper : whether or not to have debris come into the top shell (bool, default True)
+        out : if not None, array to write the rates of change into (array, default None)
+
+        Output(s):
+        dxdt : rates of change of every value in the state vector (array, 1/yr)
+
+        Note(s): uses the space in the history after the current time as scratch space
+        '''
+
+        self.grow_history(self.time + 2)
+        self.set_state(self.time + 1, x)
+        return np.concatenate([np.ravel(rate) for rate in self.dxdt(self.time + 1, upper)], out=out)
+
+    def state_tol(self, tol, default):
+        '''
+        expands a tolerance into one value for each population entry of the state vector
+
+        Parameter(s):
+        tol : tolerance, either a single value or a dictionary with any of the keys 'S', 'S_d', 'D', 'R',
+              and 'N', giving the tolerance for that population class (float or dict)
+        default : tolerance used for classes missing from a dictionary (float)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        tol_vec : tolerance for each value in the state vector, excluding the collision counts (array)
+        '''
+
+        if not isinstance(tol, dict) : tol = {}.fromkeys(['S', 'S_d', 'D', 'R', 'N'], tol)
+        num_sat, num_rb = self.num_cells*self.num_sat_types, self.num_cells*self.num_rb_types
+        num_N = self.num_cells*self.num_L*self.num_chi
+        return np.concatenate((np.full(num_sat, tol.get('S', default)), np.full(num_sat, tol.get('S_d', default)),
+                               np.full(num_sat, tol.get('D', default)), np.full(num_rb, tol.get('R', default)),
+                               np.full(num_N, tol.get('N', default))))
+
+    def pair_grads(self, S, S_d, D, R, G_SS, G_SSd, G_SD, G_DD, G_RR, H_SR, H_DR):
+        '''
+        calculates the gradient of a bilinear total over the satellite/rocket body pairs of every cell, of the form
+        S.G_SS.S + S_d.G_SS.S_d + S_d.G_SSd.S + D.G_SD.(S+S_d) + D.G_DD.D + R.G_RR.R + (S+S_d).H_SR.R + D.H_DR.R
+
+        Parameter(s):
+        S : number of live satellites of each type in each cell (2-d array)
+        S_d : number of de-orbiting satellites of each type in each cell (2-d array)
+        D : number of derelict satellites of each type in each cell (2-d array)
+        R : number of rocket bodies of each type in each cell (2-d array)
+        G_SS, G_SSd, G_SD, G_DD : satellite-satellite weights (3-d arrays, indexed (cell, type, type))
+        G_RR : rocket-rocket weights (3-d array)
+        H_SR, H_DR : satellite-rocket weights (3-d arrays, indexed (cell, satellite, rocket))
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        grad_S, grad_Sd, grad_D, grad_R : gradient of the total with respect to each population (2-d arrays)
+        '''
+
+        G_SS_sym, H_R = G_SS + np.swapaxes(G_SS, 1, 2), np.einsum('cij,cj->ci', H_SR, R)
+        grad_S = np.einsum('cij,cj->ci', G_SS_sym, S) + np.einsum('cji,cj->ci', G_SSd, S_d) + np.einsum('cji,cj->ci', G_SD, D) + H_R
+        grad_Sd = np.einsum('cij,cj->ci', G_SS_sym, S_d) + np.einsum('cij,cj->ci', G_SSd, S) + np.einsum('cji,cj->ci', G_SD, D) + H_R
+        grad_D = np.einsum('cij,cj->ci', G_SD, S + S_d) + np.einsum('cij,cj->ci', G_DD + np.swapaxes(G_DD, 1, 2), D)
+        grad_D += np.einsum('cij,cj->ci', H_DR, R)
+        grad_R = np.einsum('cij,cj->ci', G_RR + np.swapaxes(G_RR, 1, 2), R) + np.einsum('cji,cj->ci', H_SR, S + S_d)
+        grad_R += np.einsum('cji,cj->ci', H_DR, D)
+        return grad_S, grad_Sd, grad_D, grad_R
+
+    def jacobian(self, time):
+        '''
+        calculates the Jacobian of the rates of change given by dxdt with respect to the state at the given time
+
+        Parameter(s):
+        time : time (index) of the values to be used
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        J : Jacobian, with J[i,j] being the derivative of the i'th rate with respect to the j'th value in the
+            state vector (scipy csr_matrix, 1/yr)
+
+        Note(s): rows and columns are in the order given by get_state. drag lifetimes are held constant,
+        and the debris coming into the top shell does not depend on the state
+        '''
+
+        num_cells, num_sat, num_rb = self.num_cells, self.num_sat_types, self.num_rb_types
+        num_bins = self.num_L*self.num_chi
+        # state values for every cell, and their indices in the state vector
+        state = {'S' : self.S[time], 'Sd' : self.S_d[time], 'D' : self.D[time], 'R' : self.R[time],
+                 'N' : self.N_bins[time].reshape(num_cells, num_bins)}
+        sizes = {'S' : num_sat, 'Sd' : num_sat, 'D' : num_sat, 'R' : num_rb, 'N' : num_bins, 'Cc' : 1, 'Cnc' : 1}
+        idx, start = {}, 0
+        for key in ['S', 'Sd', 'D', 'R', 'N', 'Cc', 'Cnc']:
+            idx[key] = start + np.arange(num_cells*sizes[key]).reshape(num_cells, sizes[key])
+            start += num_cells*sizes[key]
+        num_x = start
+        rows, cols, vals = [], [], []
+
+        def add(row, col, val): # add derivatives of the row values with respect to the col values, for every cell
+            r, c, v = np.broadcast_arrays(idx[row][:,:,None], idx[col][:,None,:], val)
+            rows.append(r.ravel()), cols.append(c.ravel()), vals.append(v.ravel())
+
+        def add_diag(row, col, val): # same as add, but only for matching indices
+            r, c, v = np.broadcast_arrays(idx[row], idx[col], val)
+            rows.append(r.ravel()), cols.append(c.ravel()), vals.append(v.ravel())
+
+        def add_flow(key, rate): # objects flowing down from the cell above at the given rate (1/yr)
+            r, c, v = np.broadcast_arrays(idx[key][:-1], idx[key][1:], rate[1:])
+            rows.append(r.ravel()), cols.append(c.ravel()), vals.append(v.ravel())
+
+        def bilinear(row, z, x, F, sign=-1): # derivatives of sign*z[i]*sum_j(F[i,j]*x[j])
+            add_diag(row, z, sign*np.einsum('cij,cj->ci', F, state[x]))
+            add(row, x, sign*state[z][:,:,None]*F)
+
+        # debris collision factors, indexed (cell, type, bin)
+        cat_sat, cat_rb = self.cat_sat_N.reshape(num_cells, num_sat, num_bins), self.cat_rb_N.reshape(num_cells, num_rb, num_bins)
+        NS_L = np.broadcast_to((self.NS_fac[:,:,None]*self.alphaN_L)[:,:,:,None], cat_sat.shape[:2] + (self.num_L, self.num_chi)).reshape(cat_sat.shape)
+        NS = np.broadcast_to(self.NS_fac[:,:,None], cat_sat.shape)
+        NR = np.broadcast_to(self.NR_fac[:,:,None], cat_rb.shape)
+        SS_diag = np.diagonal(self.SS_fac, axis1=1, axis2=2)
+
+        # decay/ascend events and explosions
+        kill = 1/self.del_t
+        kill[self.ascending] = 1/self.fail_t[self.ascending]
+        ascend = np.where(self.ascending, 1/self.up_time, 0)
+        add_diag('S', 'S', -kill - ascend - self.expl_rate_L/100)
+        add_diag('Sd', 'S', self.P*kill)
+        add_diag('Sd', 'Sd', -1/self.tau_do - self.expl_rate_L/100)
+        add_diag('D', 'S', (1-self.P)*kill)
+        add_diag('D', 'D', -1/self.tau_sat - self.expl_rate_D/100)
+        add_diag('R', 'R', -1/self.tau_rb - self.expl_rate_R/100)
+        tau_N = np.broadcast_to(self.tau_N[:,None,:], (num_cells, self.num_L, self.num_chi)).reshape(num_cells, num_bins)
+        add_diag('N', 'N', -1/tau_N)
+        r, c = idx['S'][1:], idx['S'][:-1] # satellites ascend into the cell above
+        rows.append(r.ravel()), cols.append(c.ravel()), vals.append(ascend[:-1].ravel())
+        add_flow('Sd', 1/self.tau_do), add_flow('D', 1/self.tau_sat), add_flow('R', 1/self.tau_rb), add_flow('N', 1/tau_N)
+
+        # live satellites
+        bilinear('S', 'S', 'N', NS_L), bilinear('S', 'S', 'S', self.SS_fac), bilinear('S', 'Sd', 'S', self.SSd_fac)
+        bilinear('S', 'D', 'S', self.SD_fac), bilinear('S', 'S', 'R', self.SR_fac)
+        add_diag('S', 'S', -2*SS_diag*state['S'])
+        # de-orbiting satellites
+        bilinear('Sd', 'Sd', 'N', NS_L), bilinear('Sd', 'S', 'Sd', np.swapaxes(self.SSd_fac, 1, 2)), bilinear('Sd', 'Sd', 'Sd', self.SS_fac)
+        bilinear('Sd', 'D', 'Sd', self.SD_fac), bilinear('Sd', 'Sd', 'R', self.SR_fac)
+        add_diag('Sd', 'Sd', -2*SS_diag*state['Sd'])
+        # derelict satellites
+        bilinear('D', 'D', 'N', NS*cat_sat), bilinear('D', 'S', 'N', NS_L*~cat_sat, sign=1), bilinear('D', 'D', 'N', NS*~cat_sat, sign=1)
+        bilinear('D', 'D', 'S', self.SD_fac), bilinear('D', 'D', 'Sd', self.SD_fac), bilinear('D', 'D', 'D', np.swapaxes(self.DD_fac, 1, 2))
+        bilinear('D', 'D', 'R', self.DR_fac)
+        add_diag('D', 'D', -2*np.diagonal(self.DD_fac, axis1=1, axis2=2)*state['D'])
+        # rocket bodies
+        bilinear('R', 'R', 'N', NR*cat_rb), bilinear('R', 'R', 'R', self.RR_fac), bilinear('R', 'R', 'S', np.swapaxes(self.SR_fac, 1, 2))
+        bilinear('R', 'R', 'Sd', np.swapaxes(self.SR_fac, 1, 2)), bilinear('R', 'R', 'D', np.swapaxes(self.DR_fac, 1, 2))
+        add_diag('R', 'R', -2*np.diagonal(self.RR_fac, axis1=1, axis2=2)*state['R'])
+        # debris lost to collisions
+        bilinear('N', 'N', 'S', np.swapaxes(NS_L, 1, 2)), bilinear('N', 'N', 'Sd', np.swapaxes(NS_L, 1, 2))
+        bilinear('N', 'N', 'D', np.swapaxes(NS, 1, 2)), bilinear('N', 'N', 'R', np.swapaxes(NR, 1, 2))
+
+        # collision counts, pair collisions are all catastrophic
+        S, Sd, D, R, N = state['S'], state['Sd'], state['D'], state['R'], state['N']
+        low_sat, low_rb = ~self.double_count_filter_sat, ~self.double_count_filter_rb
+        grads = self.pair_grads(S, Sd, D, R, self.SS_fac*low_sat, self.SSd_fac, self.SD_fac, self.DD_fac*low_sat, self.RR_fac*low_rb,
+                                self.SR_fac, self.DR_fac)
+        for key, grad in zip(['S', 'Sd', 'D', 'R'], grads) : add('Cc', key, grad[:,None,:])
+        for key, cat_S, cat_R in [('Cc', cat_sat, cat_rb), ('Cnc', ~cat_sat, ~cat_rb)]:
+            add(key, 'S', np.einsum('cij,cj->ci', NS_L*cat_S, N)[:,None,:]), add(key, 'Sd', np.einsum('cij,cj->ci', NS_L*cat_S, N)[:,None,:])
+            add(key, 'D', np.einsum('cij,cj->ci', NS*cat_S, N)[:,None,:]), add(key, 'R', np.einsum('cij,cj->ci', NR*cat_R, N)[:,None,:])
+            grad_N = np.einsum('cij,ci->cj', NS_L*cat_S, S + Sd) + np.einsum('cij,ci->cj', NS*cat_S, D) + np.einsum('cij,ci->cj', NR*cat_R, R)
+            add(key, 'N', grad_N[:,None,:])
+
+        # gradients of the debris created in each cell, for collisions, satellite explosions, and rocket explosions
+        y_S, y_R = self.yield_S[:,:,None], self.yield_R[:,None,:]
+        grads = list(self.pair_grads(S, Sd, D, R, self.SS_yield_fac, self.SSd_yield_fac, self.SD_yield_fac, self.DD_yield_fac,
+                                     self.RR_yield_fac, (y_S + y_R)*self.SR_fac, (y_S + y_R)*self.DR_fac))
+        W_S, W_D = self.yield_SN.reshape(NS.shape)*NS_L, self.yield_SN.reshape(NS.shape)*NS
+        W_R = self.yield_RN.reshape(NR.shape)*NR
+        grads[0] += np.einsum('cij,cj->ci', W_S, N)
+        grads[1] += np.einsum('cij,cj->ci', W_S, N)
+        grads[2] += np.einsum('cij,cj->ci', W_D, N)
+        grads[3] += np.einsum('cij,cj->ci', W_R, N)
+        grad_N = np.einsum('cij,ci->cj', W_S, S + Sd) + np.einsum('cij,ci->cj', W_D, D) + np.einsum('cij,ci->cj', W_R, R)
+        src_grads = [(0, 'S', grads[0]), (0, 'Sd', grads[1]), (0, 'D', grads[2]), (0, 'R', grads[3]), (0, 'N', grad_N),
+                     (1, 'S', self.yield_expl_S*self.expl_rate_L/100), (1, 'Sd', self.yield_expl_S*self.expl_rate_L/100),
+                     (1, 'D', self.yield_expl_S*self.expl_rate_D/100), (2, 'R', self.yield_expl_R*self.expl_rate_R/100)]
+        src_rows, src_cols, src_vals = [], [], []
+        for k, key, grad in src_grads:
+            r, c, v = np.broadcast_arrays(k*num_cells + np.arange(num_cells)[:,None], idx[key], grad)
+            src_rows.append(r.ravel()), src_cols.append(c.ravel()), src_vals.append(v.ravel())
+        grad_src = sparse.csr_matrix((np.concatenate(src_vals), (np.concatenate(src_rows), np.concatenate(src_cols))), shape=(3*num_cells, num_x))
+        # distribute the debris between cells
+        if self.sparse_tables:
+            dist = (self.source_tables @ grad_src).tocoo()
+        else:
+            dist = (sparse.csr_matrix(self.source_tables.T) @ grad_src).tocoo()
+        rows.append(dist.row + idx['N'][0,0]), cols.append(dist.col), vals.append(dist.data)
+
+        return sparse.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(num_x, num_x))
+
+    def iter_sim(self, T, integrator='precor', out_times=None, full_state=False, record_every=None, record_times=None,
+                 **kwargs):
+        '''
+        simulates the evolution of the debris-satallite system for T years, yielding a snapshot of the system as
+        the simulation runs
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        integrator : which run_sim method to use, i.e. 'euler', 'precor', 'rk', 'rosenbrock', 'split', 'multirate',
+                     or 'ivp' (default 'precor')
+        out_times : if not None, snapshots are given at these times (linearly interpolated between steps), instead
+                    of after every accepted step (list or array, yr, default None)
+        full_state : if True, snapshots contain the full S, S_d, D, R, N, C_c, and C_nc arrays, instead of totals
+                     for each shell (bool, default False)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
+        any other keyword arguments are passed to the run_sim method
+
+        Output(s):
+        snapshot : dictionary with the time 't' (yr), and 'S', 'S_d', 'D', 'R', 'N', 'C_c', and 'C_nc' for each
+                   shell (see snapshot)
+
+        Note(s): the history is filled in as usual (see record_steps). the simulation stops where it is if the
+        generator is closed early, and can be continued with another call. out_times before the current time give
+        the current values
+        '''
+
+        steps = self.record_steps(getattr(self, '_steps_' + integrator)(T, **kwargs), record_every, record_times)
+        if out_times is None:
+            for _ in steps:
+                yield self.snapshot(self.t[self.time], self.get_state(self.time), full_state)
+            return
+
+        out_times = np.sort(out_times)
+        k = 0 # index of the next output time
+        t_prev, x_prev = self.t[self.time], self.get_state(self.time)
+        while k < out_times.size and out_times[k] <= t_prev:
+            yield self.snapshot(out_times[k], x_prev, full_state)
+            k += 1
+        for _ in steps:
+            if k == out_times.size : return
+            t_now, x_now = self.t[self.time], self.get_state(self.time)
+            while k < out_times.size and out_times[k] <= t_now: # interpolate to the output times in this step
+                w = (out_times[k] - t_prev)/(t_now - t_prev)
+                yield self.snapshot(out_times[k], (1-w)*x_prev + w*x_now, full_state)
+                k += 1
+            t_prev, x_prev = t_now, x_now
+
+    def snapshot(self, t, x, full_state=False):
+        '''
+        builds a snapshot of the system from a state vector
+
+        Parameter(s):
+        t : time of the snapshot (yr)
+        x : state vector, in the format given by get_state (array)
+
+        Keyword Parameter(s):
+        full_state : if True, the full arrays are given, instead of totals for each shell (bool, default False)
+
+        Output(s):
+        snapshot : dictionary with the time 't' (yr), and 'S', 'S_d', 'D', 'R', 'N', 'C_c', and 'C_nc', either
+                   summed over the types/bins in each shell (arrays) or as the full arrays in the format of one
+                   time of the history arrays
+        '''
+
+        snapshot = {'t' : t}
+        for key, val in zip(['S', 'S_d', 'D', 'R', 'N', 'C_c', 'C_nc'], self.split_state(x)):
+            if full_state or val.ndim == 1 : snapshot[key] = val
+            else : snapshot[key] = np.sum(val.reshape(self.num_cells, -1), axis=1)
+        return snapshot
+
+    def record_steps(self, steps, record_every=None, record_times=None):
+        '''
+        runs through the steps of one of the integrators, only keeping the requested steps in the history
+
+        Parameter(s):
+        steps : generator from one of the _steps methods, i.e. _steps_euler
+
+        Keyword Parameter(s):
+        record_every : if not None, steps are only kept once at least this long after the last kept step (yr,
+                       default None)
+        record_times : if not None, the first step at or after each of these times is kept (list or array, yr,
+                       default None)
+
+        Output(s): yields after every step, like the _steps methods
+
+        Note(s): if both record_every and record_times are None, every step is kept. otherwise, the latest step is
+        always at the end of the history, and is overwritten by the next step if it isn't kept, so the history only
+        grows with the kept steps
+        '''
+
+        if record_every is None and record_times is None:
+            yield from steps
+            return
+
+        record_times = np.sort(np.atleast_1d(record_times)) if record_times is not None else np.zeros(0)
+        k = np.searchsorted(record_times, self.t[self.time], side='right') # index of the next record time
+        last_rec = self.time # index of the last kept step
+        for _ in steps:
+            if self.time == last_rec + 2: # the previous step wasn't kept, move the new step on top of it
+                now, prev = self.time, last_rec + 1
+                self.set_state(prev, self.get_state(now))
+                self.t[prev] = self.t[now]
+                self.time = prev
+            t = self.t[self.time]
+            record = (record_every is not None) and (t - self.t[last_rec] >= record_every)
+            if k < record_times.size and t >= record_times[k]:
+                record = True
+                k = np.searchsorted(record_times, t, side='right')
+            if record : last_rec = self.time
+            yield
+
+    def run_sim_euler(self, T, dt=1, upper=True, record_every=None, record_times=None):
+        '''
+        simulates the evolution of the debris-satallite system for T years using a Euler method
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        dt : timestep used by the simulation (yr, default 1yr)
+        upper : whether or not to have debris come into the top shell (bool, default True)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
+
+        Output(s): None
+        '''
+
+        if dt > 0 and record_every is None and record_times is None: # make room for all the steps
+            self.grow_history(self.time + 2 + int(max(T - self.t[self.time], 0)/dt))
+        steps = self._steps_euler(T, dt=dt, upper=upper)
+        for _ in self.record_steps(steps, record_every, record_times) : pass
+
+    def _steps_euler(self, T, dt=1, upper=True):
+        '''
+        generator version of run_sim_euler, yielding after every accepted step (see iter_sim)
+        '''
+
+        self.sim_events() # run initial discrete events
+
+        while self.t[self.time] < T:
+            if (self.t[self.time] - self.lupdate_t) >= self.update_period:
+                    self.update_lifetimes(self.t[self.time])
+                    self.lupdate_t = self.t[self.time]
+            dSdt, dS_ddt, dDdt, dRdt, dNdt, dCcdt, dCncdt = self.dxdt(self.time, upper) # get current rates of change
+
+            self.grow_history(self.time + 2)
+            now, nxt = self.time, self.time + 1 # update values for all cells at once
+            self.S[nxt] = self.S[now] + dSdt*dt
+            self.S_d[nxt] = self.S_d[now] + dS_ddt*dt
+            self.D[nxt] = self.D[now] + dDdt*dt
+            self.R[nxt] = self.R[now] + dRdt*dt
+            self.N_bins[nxt] = self.N_bins[now] + dNdt*dt
+            self.C_c[nxt] = self.C_c[now] + dCcdt*dt
+            self.C_nc[nxt] = self.C_nc[now] + dCncdt*dt
+            self.t[nxt] = self.t[now] + dt # update time
+            self.time += 1
+            self.sim_events() # run discrete events
+            yield
+
+    def run_sim_precor(self, T, dt_i=1, dt_min=0, dt_max=1, tolerance=1, err_factor=1e-6, upper=True, safety=0.9,
+                       fac_min=0.2, fac_max=5, reuse_rates=False, restart=False, record_every=None,
+                       record_times=None):
+        '''
+        simulates the evolution of the debris-satallite system for T years using an adaptive predictor-corrector
+        method
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        dt_i : initial timestep used by the simulation (yr, default 1)
+        dt_min : minimum time step used by the simulation is, must be non-zero when starting fresh (yr, default 0)
         dt_max : maximum time step used by simulation (yr, default 1)
-        tolerance : tolerance for adaptive time step
-        err_factor : how close to tolerance epsilon can be without actually triggering a redo
+        tolerance : largest absolute error allowed in any value in one step (number of objects, default 1)
+        err_factor : how close to tolerance the error can be without actually triggering a redo (default 1e-6)
         upper : whether or not to have debris come into the top shell (bool, default True)
+        safety : safety factor applied to the new time step (default 0.9)
+        fac_min : minimum factor the time step can change by in one step (default 0.2)
+        fac_max : maximum factor the time step can change by in one step (default 5)
+        reuse_rates : if True, the rates of change found from the predicted values are re-used for the next
+                      step when no discrete events occured, instead of re-calculating them from the corrected
+                      values (bool, default False)
+        restart : if True, the integrator is started fresh even if it can continue from the last call (bool,
+                  default False)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
 
         Output(s): None
 
-        Note(s): AB(2) method is used as predictor, Trapezoid method as corrector
+        Note(s): AB(2) method is used as predictor, Trapezoid method as corrector. the time step is set by a PI
+        controller on the largest error over all non-zero values, the collision counts are not used. reuse_rates
+        turns the method from predict-evaluate-correct-evaluate to predict-evaluate-correct, which saves one of
+        the two rate calculations per step at the cost of some accuracy and stability. the rates of change, time
+        steps, and error of the last step are kept in precor_state, and the next call continues from them (starting
+        with the last time step reached instead of dt_i) as long as the system is still at the same time. when
+        starting fresh, a Euler step of dt_min is taken first if the system is at its initial time, and dt_min is
+        used as the previous time step. steps that can't meet the tolerance at dt_min are accepted with a warning
+        '''
+
+        steps = self._steps_precor(T, dt_i=dt_i, dt_min=dt_min, dt_max=dt_max, tolerance=tolerance, err_factor=err_factor,
+                                   upper=upper, safety=safety, fac_min=fac_min, fac_max=fac_max, reuse_rates=reuse_rates,
+                                   restart=restart)
+        for _ in self.record_steps(steps, record_every, record_times) : pass
+
+    def _steps_precor(self, T, dt_i=1, dt_min=0, dt_max=1, tolerance=1, err_factor=1e-6, upper=True, safety=0.9,
+                      fac_min=0.2, fac_max=5, reuse_rates=False, restart=False):
+        '''
+        generator version of run_sim_precor, yielding after every accepted step (see iter_sim)
         '''
 
         warning_given = False # whether or not a warning has been given yet
-        # get additional initial value if needed
-        if self.time == 0 : self.run_sim_euler(dt_min, dt=dt_min, upper=upper)
-        # get previous rate of change values
-        self.update_lifetimes(self.t[self.time-1])
-        dSdt_n, dSddt_n, dDdt_n, dRdt_n, dNdt_n, dCcdt_n, dCncdt_n = self.dxdt(self.time-1, upper=upper)
-        # get current rate of change values
-        self.update_lifetimes(self.t[self.time])
-        self.lupdate_time = self.time
-        dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1 = self.dxdt(self.time, upper=upper)
-        dt_old = dt_min # set up old time step variable
-        dt = dt_i
+        k_I, k_P = 0.7/3, 0.4/3 # PI controller gains, for an error estimate of order 3
+        num_pop = self.get_state(self.time).size - 2*self.num_cells # number of values used for error control
+        state = self.precor_state
+        if (not restart) and (state is not None) and state['t'] == self.t[self.time]:
+            # continue from where the last call stopped
+            dSdt_n, dSddt_n, dDdt_n, dRdt_n, dNdt_n, dCcdt_n, dCncdt_n = state['rates_n']
+            dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1 = state['rates_n1']
+            dt_old, dt, epsilon_old = state['dt_old'], state['dt'], state['epsilon_old']
+        else:
+            epsilon_old = tolerance # error of the last accepted step
+            # get additional initial value if needed
+            if self.time == 0 : self.run_sim_euler(dt_min, dt=dt_min, upper=upper)
+            # get previous rate of change values
+            prev = max(self.time-1, 0)
+            self.update_lifetimes(self.t[prev])
+            dSdt_n, dSddt_n, dDdt_n, dRdt_n, dNdt_n, dCcdt_n, dCncdt_n = self.dxdt(prev, upper=upper)
+            # get current rate of change values
+            self.update_lifetimes(self.t[self.time])
+            self.lupdate_t = self.t[self.time]
+            dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1 = self.dxdt(self.time, upper=upper)
+            dt_old = dt_min # set up old time step variable
+            dt = dt_i
         updated, redo = False, False
 
         while self.t[self.time] < T:
             if updated and redo:
                 self.update_lifetimes(self.t[self.time])
-            elif updated:
-                self.lupdate_time = self.time
             redo = False
             updated = False
             # step forwards using AB(2) method
-            for i in range(self.num_cells): # iterate through cells and update values
-                curr_cell = self.cells[i]
-
-                if len(curr_cell.N_bins) < self.time + 2: # check if we need to lengthen things
-                    curr_cell.S.append(0)
-                    curr_cell.S_d.append(0)
-                    curr_cell.D.append(0)
-                    curr_cell.R.append(0)
-                    curr_cell.N_bins.append(0)
-                    curr_cell.C_c.append(0)
-                    curr_cell.C_nc.append(0)
-
-                curr_cell.S[self.time+1] = curr_cell.S[self.time] + 0.5*dt*((2+dt/dt_old)*dSdt_n1[i]-(dt/dt_old)*dSdt_n[i])
-                curr_cell.S_d[self.time+1] = curr_cell.S_d[self.time] + 0.5*dt*((2+dt/dt_old)*dSddt_n1[i]-(dt/dt_old)*dSddt_n[i])
-                curr_cell.D[self.time+1] = curr_cell.D[self.time] + 0.5*dt*((2+dt/dt_old)*dDdt_n1[i]-(dt/dt_old)*dDdt_n[i])
-                curr_cell.R[self.time+1] = curr_cell.R[self.time] + 0.5*dt*((2+dt/dt_old)*dRdt_n1[i]-(dt/dt_old)*dRdt_n[i])
-                curr_cell.N_bins[self.time+1] = curr_cell.N_bins[self.time] + 0.5*dt*((2+dt/dt_old)*dNdt_n1[i]-(dt/dt_old)*dNdt_n[i])
-                curr_cell.C_c[self.time+1] = curr_cell.C_c[self.time] + 0.5*dt*((2+dt/dt_old)*dCcdt_n1[i]-(dt/dt_old)*dCcdt_n[i])
-                curr_cell.C_nc[self.time+1] = curr_cell.C_nc[self.time] + 0.5*dt*((2+dt/dt_old)*dCncdt_n1[i]-(dt/dt_old)*dCncdt_n[i])
+            self.grow_history(self.time + 2) # check if we need to lengthen things
+            now, nxt = self.time, self.time + 1 # update values for all cells at once
+            self.S[nxt] = self.S[now] + 0.5*dt*((2+dt/dt_old)*dSdt_n1-(dt/dt_old)*dSdt_n)
+            self.S_d[nxt] = self.S_d[now] + 0.5*dt*((2+dt/dt_old)*dSddt_n1-(dt/dt_old)*dSddt_n)
+            self.D[nxt] = self.D[now] + 0.5*dt*((2+dt/dt_old)*dDdt_n1-(dt/dt_old)*dDdt_n)
+            self.R[nxt] = self.R[now] + 0.5*dt*((2+dt/dt_old)*dRdt_n1-(dt/dt_old)*dRdt_n)
+            self.N_bins[nxt] = self.N_bins[now] + 0.5*dt*((2+dt/dt_old)*dNdt_n1-(dt/dt_old)*dNdt_n)
+            self.C_c[nxt] = self.C_c[now] + 0.5*dt*((2+dt/dt_old)*dCcdt_n1-(dt/dt_old)*dCcdt_n)
+            self.C_nc[nxt] = self.C_nc[now] + 0.5*dt*((2+dt/dt_old)*dCncdt_n1-(dt/dt_old)*dCncdt_n)
             # get predicted rate of change from AB(2) method prediction
-            if (self.t[self.time] + dt - self.t[self.lupdate_time]) >= self.update_period:
+            if (self.t[self.time] + dt - self.lupdate_t) >= self.update_period:
                 self.update_lifetimes(self.t[self.time] + dt)
                 updated = True
             dSdt_n2, dSddt_n2, dDdt_n2, dRdt_n2, dNdt_n2, dCcdt_n2, dCncdt_n2 = self.dxdt(self.time+1, upper=upper)
-            # set up variable for step size checking
-            epsilon = 0
+            # get old values
+            x_pred = self.get_state(nxt)[:num_pop]
             # re-do step using Trapezoid method
-            for i in range(self.num_cells): # iterate through cells and update values
-                curr_cell = self.cells[i]
-                # get old values
-                old_S = curr_cell.S[self.time+1]
-                old_Sd = curr_cell.S_d[self.time+1]
-                old_D = curr_cell.D[self.time+1]
-                old_R = curr_cell.R[self.time+1]
-                old_N = curr_cell.N_bins[self.time+1]
-
-                # update with new values
-                curr_cell.S[self.time+1] = curr_cell.S[self.time] + 0.5*(dSdt_n2[i]+dSdt_n1[i])*dt
-                curr_cell.S_d[self.time+1] = curr_cell.S_d[self.time] + 0.5*(dSddt_n2[i]+dSddt_n1[i])*dt
-                curr_cell.D[self.time+1] = curr_cell.D[self.time] + 0.5*(dDdt_n2[i]+dDdt_n1[i])*dt
-                curr_cell.R[self.time+1] = curr_cell.R[self.time] + 0.5*(dRdt_n2[i]+dRdt_n1[i])*dt
-                curr_cell.N_bins[self.time+1] = curr_cell.N_bins[self.time] + 0.5*(dNdt_n2[i]+dNdt_n1[i])*dt
-
-                # estimate errors with old and new values
-                valid_choice_S = curr_cell.S[self.time] != 0
-                valid_choice_Sd = curr_cell.S_d[self.time] != 0
-                valid_choice_D = curr_cell.D[self.time] != 0
-                valid_choice_R = curr_cell.R[self.time] != 0
-                valid_choice_N = curr_cell.N_bins[self.time] != 0
-                if np.any(valid_choice_S) == True:
-                    epsilon_options = np.abs((1/3)*(dt/(dt+dt_old))*(curr_cell.S[self.time+1][valid_choice_S]-old_S[valid_choice_S]))
-                    epsilon = max(np.amax(epsilon_options), epsilon)
-                if np.any(valid_choice_Sd) == True:
-                    epsilon_options = np.abs((1/3)*(dt/(dt+dt_old))*(curr_cell.S_d[self.time+1][valid_choice_Sd]-old_Sd[valid_choice_Sd]))
-                    epsilon = max(np.amax(epsilon_options), epsilon)
-                if np.any(valid_choice_D) == True:
-                    epsilon_options = np.abs((1/3)*(dt/(dt+dt_old))*(curr_cell.D[self.time+1][valid_choice_D]-old_D[valid_choice_D]))
-                    epsilon = max(np.amax(epsilon_options), epsilon)
-                if np.any(valid_choice_R) == True:
-                    epsilon_options = np.abs((1/3)*(dt/(dt+dt_old))*(curr_cell.R[self.time+1][valid_choice_R]-old_R[valid_choice_R]))
-                    epsilon = max(np.amax(epsilon_options), epsilon)
-                if np.any(valid_choice_N) == True:
-                    epsilon_options = np.abs((1/3)*(dt/(dt+dt_old))*(curr_cell.N_bins[self.time+1][valid_choice_N]-old_N[valid_choice_N]))
-                    epsilon = max(np.amax(epsilon_options), epsilon)
-   
-                # we don't really care that much about the accuracy of the collision count
-                curr_cell.C_c[self.time+1] = curr_cell.C_c[self.time] + 0.5*(dCcdt_n2[i]+dCcdt_n1[i])*dt
-                curr_cell.C_nc[self.time+1] = curr_cell.C_nc[self.time] + 0.5*(dCncdt_n2[i]+dCncdt_n1[i])*dt
+            self.S[nxt] = self.S[now] + 0.5*(dSdt_n2+dSdt_n1)*dt
+            self.S_d[nxt] = self.S_d[now] + 0.5*(dSddt_n2+dSddt_n1)*dt
+            self.D[nxt] = self.D[now] + 0.5*(dDdt_n2+dDdt_n1)*dt
+            self.R[nxt] = self.R[now] + 0.5*(dRdt_n2+dRdt_n1)*dt
+            self.N_bins[nxt] = self.N_bins[now] + 0.5*(dNdt_n2+dNdt_n1)*dt
+            # we don't really care that much about the accuracy of the collision count
+            self.C_c[nxt] = self.C_c[now] + 0.5*(dCcdt_n2+dCcdt_n1)*dt
+            self.C_nc[nxt] = self.C_nc[now] + 0.5*(dCncdt_n2+dCncdt_n1)*dt
+            # estimate the error from the difference between the predicted and corrected values
+            nonzero = self.get_state(now)[:num_pop] != 0
+            epsilon = (1/3)*(dt/(dt+dt_old))*np.amax(np.abs(self.get_state(nxt)[:num_pop] - x_pred), where=nonzero, initial=0)
 
             # update step size, and check if calculation needs to be redone
             if (epsilon > tolerance) and (np.abs(epsilon - tolerance) > err_factor):
                 redo = True
-            new_dt = min(np.abs(dt*(tolerance/epsilon)**(1/3)), dt_max)
+            epsilon = max(epsilon, 1e-10*tolerance)
+            if redo : fac = safety*(tolerance/epsilon)**(1/3) # just use the current error after a rejected step
+            else : fac = safety*(tolerance/epsilon)**k_I*(epsilon_old/tolerance)**k_P
+            new_dt = min(dt*min(fac_max, max(fac_min, fac)), dt_max)
             if redo:
                 if dt <= dt_min:
                     if not warning_given:
@@ -850,15 +2021,567 @@ class NCell:
                     continue
 
             # update time
-            self.t.append(self.t[self.time] + dt)
+            self.t[self.time+1] = self.t[self.time] + dt
+            epsilon_old = epsilon
             self.time += 1
             dt_old = dt
             dt = new_dt
             # run events
-            self.sim_events()
+            changed = self.sim_events()
             # update which are the old and new rates of change
             dSdt_n, dSddt_n, dDdt_n, dRdt_n, dNdt_n, dCcdt_n, dCncdt_n = dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1
-            dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1 = self.dxdt(self.time, upper)
+            if reuse_rates and not changed: # lifetimes were already updated before the rates were found
+                dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1 = dSdt_n2, dSddt_n2, dDdt_n2, dRdt_n2, dNdt_n2, dCcdt_n2, dCncdt_n2
+            else:
+                dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1 = self.dxdt(self.time, upper)
+            if updated : self.lupdate_t = self.t[self.time] # lifetimes were updated on this step
+            # save the integrator state for the next call
+            self.precor_state = {'t' : self.t[self.time], 'dt_old' : dt_old, 'dt' : dt, 'epsilon_old' : epsilon_old,
+                                 'rates_n' : (dSdt_n, dSddt_n, dDdt_n, dRdt_n, dNdt_n, dCcdt_n, dCncdt_n),
+                                 'rates_n1' : (dSdt_n1, dSddt_n1, dDdt_n1, dRdt_n1, dNdt_n1, dCcdt_n1, dCncdt_n1)}
+            yield
+
+    def run_sim_rosenbrock(self, T, dt_i=1, dt_min=0, dt_max=1, rtol=1e-3, atol=1e-2, upper=True, record_every=None,
+                           record_times=None):
+        '''
+        simulates the evolution of the debris-satallite system for T years using an implicit Rosenbrock method,
+        suitable for stiff systems (i.e. fast-decaying debris in low shells)
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        dt_i : initial timestep used by the simulation (yr, default 1)
+        dt_min : minimum time step used by the simulation is (yr, default 0)
+        dt_max : maximum time step used by simulation (yr, default 1)
+        rtol : relative tolerance for the adaptive time step (default 1e-3)
+        atol : absolute tolerance for the adaptive time step (default 1e-2)
+        upper : whether or not to have debris come into the top shell (bool, default True)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
+
+        Output(s): None
+
+        Note(s): uses the L-stable, second order ROS2 method, with the linearly-implicit Euler method for
+        the error estimate. the Jacobian is re-calculated every step. the collision counts are not used for
+        step size control
+        '''
+
+        steps = self._steps_rosenbrock(T, dt_i=dt_i, dt_min=dt_min, dt_max=dt_max, rtol=rtol, atol=atol,
+                                       upper=upper)
+        for _ in self.record_steps(steps, record_every, record_times) : pass
+
+    def _steps_rosenbrock(self, T, dt_i=1, dt_min=0, dt_max=1, rtol=1e-3, atol=1e-2, upper=True):
+        '''
+        generator version of run_sim_rosenbrock, yielding after every accepted step (see iter_sim)
+        '''
+
+        gamma = 1 + 1/np.sqrt(2)
+        num_pop = self.get_state(self.time).size - 2*self.num_cells # number of values used for error control
+        warning_given = False # whether or not a warning has been given yet
+        dt = dt_i
+        self.sim_events() # run initial discrete events
+
+        while self.t[self.time] < T:
+            if (self.t[self.time] - self.lupdate_t) >= self.update_period:
+                self.update_lifetimes(self.t[self.time])
+                self.lupdate_t = self.t[self.time]
+            x = self.get_state(self.time)
+            f = np.concatenate([np.ravel(rate) for rate in self.dxdt(self.time, upper)])
+            J = self.jacobian(self.time)
+            I = sparse.identity(x.size, format='csc')
+
+            while True: # try steps until one is accurate enough
+                lu = splu((I - gamma*dt*J).tocsc())
+                k1 = lu.solve(f)
+                k2 = lu.solve(self.dxdt_state(x + dt*k1, upper) - 2*k1)
+                x_new = x + 1.5*dt*k1 + 0.5*dt*k2
+                # compare to the linearly-implicit Euler step
+                scale = atol + rtol*np.maximum(np.abs(x[:num_pop]), np.abs(x_new[:num_pop]))
+                err = np.amax(np.abs(0.5*dt*(k1 + k2)[:num_pop])/scale)
+                new_dt = min(dt*min(5, max(0.2, 0.9/np.sqrt(max(err, 1e-10)))), dt_max)
+                if err <= 1 : break
+                if dt <= dt_min:
+                    if not warning_given:
+                        print('WARNING : Time step is below dt_min, error tolerance may not be met')
+                        warning_given = True
+                    new_dt = dt_min
+                    break
+                dt = max(new_dt, dt_min)
+
+            self.grow_history(self.time + 2)
+            self.set_state(self.time + 1, x_new)
+            self.t[self.time+1] = self.t[self.time] + dt # update time
+            self.time += 1
+            dt = new_dt
+            self.sim_events() # run discrete events
+            yield
+
+    def run_sim_rk(self, T, dt_i=1, dt_min=0, dt_max=1, rtol=1e-3, atol=1e-2, method='DP45', upper=True, record_every=None,
+                   record_times=None):
+        '''
+        simulates the evolution of the debris-satallite system for T years using an adaptive, embedded
+        Runge-Kutta method
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        dt_i : initial timestep used by the simulation (yr, default 1)
+        dt_min : minimum time step used by the simulation is (yr, default 0)
+        dt_max : maximum time step used by simulation (yr, default 1)
+        rtol : relative tolerance for the adaptive time step, either a single value or a dictionary giving
+               the tolerance for any of 'S', 'S_d', 'D', 'R', and 'N' (float or dict, default 1e-3)
+        atol : absolute tolerance for the adaptive time step, in the same format as rtol (float or dict, default 1e-2)
+        method : Runge-Kutta pair to use, either 'DP45' (Dormand-Prince 5(4)) or 'BS23' (Bogacki-Shampine 3(2))
+                 (default 'DP45')
+        upper : whether or not to have debris come into the top shell (bool, default True)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
+
+        Output(s): None
+
+        Note(s): classes missing from an rtol/atol dictionary use the default value. the collision counts are
+        not used for step size control. rejected steps re-use the first stage, and the last stage of an accepted
+        step is re-used as the first stage of the next unless the lifetimes were updated or a discrete event occured
+        '''
+
+        steps = self._steps_rk(T, dt_i=dt_i, dt_min=dt_min, dt_max=dt_max, rtol=rtol, atol=atol, method=method,
+                               upper=upper)
+        for _ in self.record_steps(steps, record_every, record_times) : pass
+
+    def _steps_rk(self, T, dt_i=1, dt_min=0, dt_max=1, rtol=1e-3, atol=1e-2, method='DP45', upper=True):
+        '''
+        generator version of run_sim_rk, yielding after every accepted step (see iter_sim)
+        '''
+
+        A, b, b_err, q = self.rk_tableaux[method]
+        e = b - b_err # weights for the error estimate
+        num_pop = self.get_state(self.time).size - 2*self.num_cells # number of values used for error control
+        rtol_vec, atol_vec = self.state_tol(rtol, 1e-3), self.state_tol(atol, 1e-2)
+        warning_given = False # whether or not a warning has been given yet
+        dt = dt_i
+        self.sim_events() # run initial discrete events
+        # scratch space for the stages
+        x = self.get_state(self.time)
+        K = np.empty((b.size, x.size))
+        x_stage, err_vec = np.empty(x.size), np.empty(num_pop)
+        reuse = False # whether or not the last stage can be re-used
+
+        while self.t[self.time] < T:
+            if (self.t[self.time] - self.lupdate_t) >= self.update_period:
+                self.update_lifetimes(self.t[self.time])
+                self.lupdate_t = self.t[self.time]
+                reuse = False
+            x = self.get_state(self.time)
+            if reuse : K[0] = K[-1]
+            else : np.concatenate([np.ravel(rate) for rate in self.dxdt(self.time, upper)], out=K[0])
+
+            while True: # try steps until one is accurate enough
+                for i in range(1, b.size):
+                    np.dot(A[i,:i], K[:i], out=x_stage)
+                    x_stage *= dt
+                    x_stage += x
+                    self.dxdt_state(x_stage, upper, out=K[i])
+                # the last stage is at the new values, compare it to the embedded solution
+                np.dot(e, K[:,:num_pop], out=err_vec)
+                np.abs(err_vec, out=err_vec)
+                err = dt*np.amax(err_vec/(atol_vec + rtol_vec*np.maximum(np.abs(x[:num_pop]), np.abs(x_stage[:num_pop]))))
+                new_dt = min(dt*min(5, max(0.2, 0.9*max(err, 1e-10)**(-1/(q+1)))), dt_max)
+                if err <= 1 : break
+                if dt <= dt_min:
+                    if not warning_given:
+                        print('WARNING : Time step is below dt_min, error tolerance may not be met')
+                        warning_given = True
+                    new_dt = dt_min
+                    break
+                dt = max(new_dt, dt_min)
+
+            self.grow_history(self.time + 2)
+            self.set_state(self.time + 1, x_stage)
+            self.t[self.time+1] = self.t[self.time] + dt # update time
+            self.time += 1
+            dt = new_dt
+            reuse = not self.sim_events() # run discrete events
+            yield
+
+    def run_sim_split(self, T, dt=1, upper=True, record_every=None, record_times=None):
+        '''
+        simulates the evolution of the debris-satallite system for T years using an exponential operator-splitting
+        method, where the linear decay and transport terms are applied exactly
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        dt : timestep used by the simulation (yr, default 1yr)
+        upper : whether or not to have debris come into the top shell (bool, default True)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
+
+        Output(s): None
+
+        Note(s): uses Strang splitting, with half steps of the exact solution of the linear terms (see linear_rates)
+        around an explicit midpoint step of the remaining launch and collision terms, which is second order. the
+        matrix exponential is only re-calculated when the lifetimes are updated, and the time step only has to
+        resolve the collision timescales, not the drag lifetimes
+        '''
+
+        if dt > 0 and record_every is None and record_times is None: # make room for all the steps
+            self.grow_history(self.time + 2 + int(max(T - self.t[self.time], 0)/dt))
+        steps = self._steps_split(T, dt=dt, upper=upper)
+        for _ in self.record_steps(steps, record_every, record_times) : pass
+
+    def _steps_split(self, T, dt=1, upper=True):
+        '''
+        generator version of run_sim_split, yielding after every accepted step (see iter_sim)
+        '''
+
+        self.sim_events() # run initial discrete events
+        prop = None # exact solution operator of the linear terms over half a step
+
+        while self.t[self.time] < T:
+            if (self.t[self.time] - self.lupdate_t) >= self.update_period:
+                self.update_lifetimes(self.t[self.time])
+                self.lupdate_t = self.t[self.time]
+                prop = None
+            if prop is None:
+                A = self.linear_rates()
+                prop = expm((0.5*dt*A).tocsc())
+
+            x = prop @ self.get_state(self.time)
+            x_mid = x + 0.5*dt*(self.dxdt_state(x, upper) - A @ x)
+            x = prop @ (x + dt*(self.dxdt_state(x_mid, upper) - A @ x_mid))
+
+            self.grow_history(self.time + 2)
+            self.set_state(self.time + 1, x)
+            self.t[self.time+1] = self.t[self.time] + dt # update time
+            self.time += 1
+            self.sim_events() # run discrete events
+            yield
+
+    def run_sim_multirate(self, T, dt=1, rate_limit=1, upper=True, record_every=None, record_times=None):
+        '''
+        simulates the evolution of the debris-satallite system for T years using a multirate method, where
+        fast-changing values take several substeps for each step of the slow-changing values
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        dt : timestep used for the slow values (yr, default 1yr)
+        rate_limit : largest value of (decay rate)*(time step) allowed for a value, values above this with the slow
+                     time step are substepped, and the number of substeps is chosen to keep all values below it
+                     (default 1)
+        upper : whether or not to have debris come into the top shell (bool, default True)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
+
+        Output(s): None
+
+        Note(s): the decay rate of each value is taken from the diagonal of the Jacobian, so includes drag, de-orbiting,
+        and collisions, and is re-calculated when the lifetimes are updated. if a value is fast in any cell, it is fast
+        in every cell, so flows between cells stay within one group. the slow values use Heun's method, and the fast
+        values use Heun's method on each substep with the slow values interpolated between the start and predicted
+        end of the step. the fast values are then corrected for the change in the slow values from the slow corrector,
+        so that transfers from slow to fast values match on both sides. the collision counts are treated as slow
+        '''
+
+        if dt > 0 and record_every is None and record_times is None: # make room for all the steps
+            self.grow_history(self.time + 2 + int(max(T - self.t[self.time], 0)/dt))
+        steps = self._steps_multirate(T, dt=dt, rate_limit=rate_limit, upper=upper)
+        for _ in self.record_steps(steps, record_every, record_times) : pass
+
+    def _steps_multirate(self, T, dt=1, rate_limit=1, upper=True):
+        '''
+        generator version of run_sim_multirate, yielding after every accepted step (see iter_sim)
+        '''
+
+        self.sim_events() # run initial discrete events
+        num_pop = self.get_state(self.time).size - 2*self.num_cells
+        fast = None # which values are in the fast group
+
+        while self.t[self.time] < T:
+            if (self.t[self.time] - self.lupdate_t) >= self.update_period:
+                self.update_lifetimes(self.t[self.time])
+                self.lupdate_t = self.t[self.time]
+                fast = None
+            x = self.get_state(self.time)
+            if fast is None: # group values by their decay rates
+                rate = np.abs(self.jacobian(self.time).diagonal())
+                fast = np.full(x.size, False)
+                fast[:num_pop] = np.concatenate([np.broadcast_to(np.any(group.reshape(self.num_cells, -1), axis=0), (self.num_cells, group.size//self.num_cells)).ravel()
+                                                 for group in self.split_state(rate*dt > rate_limit)[:5]])
+                slow = ~fast
+                num_sub = max(1, int(np.ceil(np.amax(rate[fast], initial=0)*dt/rate_limit)))
+                h = dt/num_sub
+
+            # predict the slow values
+            f_0 = np.concatenate([np.ravel(rate) for rate in self.dxdt(self.time, upper)])
+            x_pred = x + dt*f_0
+            # substep the fast values, with the slow values interpolated
+            y, f_y = x.copy(), f_0
+            for k in range(num_sub):
+                y[slow] = x[slow] + (k/num_sub)*(x_pred[slow] - x[slow])
+                if k > 0 : f_y = self.dxdt_state(y, upper)
+                y_2 = y + h*f_y
+                y_2[slow] = x[slow] + ((k+1)/num_sub)*(x_pred[slow] - x[slow])
+                y[fast] += 0.5*h*(f_y[fast] + self.dxdt_state(y_2, upper)[fast])
+            # correct the slow values, then the fast values for the change in the slow ones
+            y[slow] = x_pred[slow]
+            f_pred = self.dxdt_state(y, upper)
+            y[slow] = x[slow] + 0.5*dt*(f_0[slow] + f_pred[slow])
+            if np.any(fast) : y[fast] += 0.5*dt*(self.dxdt_state(y, upper)[fast] - f_pred[fast])
+
+            self.grow_history(self.time + 2)
+            self.set_state(self.time + 1, y)
+            self.t[self.time+1] = self.t[self.time] + dt # update time
+            self.time += 1
+            self.sim_events() # run discrete events
+            yield
+
+    def linear_rates(self):
+        '''
+        finds the matrix of the terms in the rates of change that are linear in the state, i.e. decay, de-orbiting,
+        ascent, failures, explosions, and flows between shells, using the current lifetimes
+
+        Parameter(s): None
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        A : matrix of the linear terms, in the format given by jacobian (scipy csr_matrix, 1/yr)
+
+        Note(s): the rates are the sum of a constant (launches), these linear terms, and terms bilinear in the state
+        (collisions), so A is the Jacobian of an empty system
+        '''
+
+        return self.jacobian_state(np.zeros(self.get_state(self.time).size))
+
+    def run_sim_ivp(self, T, method='LSODA', rtol=1e-3, atol=1e-2, dt_out=None, upper=True, record_every=None,
+                    record_times=None):
+        '''
+        simulates the evolution of the debris-satallite system for T years using scipy.integrate.solve_ivp
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        method : integration method to use, any method accepted by solve_ivp (i.e. 'LSODA', 'Radau', 'BDF',
+                 'RK45', default 'LSODA')
+        rtol : relative tolerance for the solver (default 1e-3)
+        atol : absolute tolerance for the solver (default 1e-2)
+        dt_out : if not None, values are saved every dt_out years using the solver's dense output, instead of
+                 at every step the solver takes (yr, default None)
+        upper : whether or not to have debris come into the top shell (bool, default True)
+        record_every : if not None, steps are only kept in the history once at least this long after the last kept
+                       step (yr, default None)
+        record_times : if not None, the first step at or after each of these times is kept in the history (list
+                       or array, yr, default None)
+
+        Output(s): None
+
+        Note(s): the system is integrated in segments between drag lifetime updates and discrete event times,
+        with the lifetimes held constant within each segment. the end of each segment is always saved.
+        'LSODA', 'Radau', and 'BDF' use the analytic Jacobian
+        '''
+
+        steps = self._steps_ivp(T, method=method, rtol=rtol, atol=atol, dt_out=dt_out, upper=upper)
+        for _ in self.record_steps(steps, record_every, record_times) : pass
+
+    def _steps_ivp(self, T, method='LSODA', rtol=1e-3, atol=1e-2, dt_out=None, upper=True):
+        '''
+        generator version of run_sim_ivp, yielding after every accepted step (see iter_sim)
+        '''
+
+        jac = None
+        if method == 'LSODA':
+            jac = lambda t, x : self.jacobian_state(x).toarray()
+        elif method in ['Radau', 'BDF']:
+            jac = lambda t, x : self.jacobian_state(x)
+        self.sim_events() # run initial discrete events
+
+        while self.t[self.time] < T:
+            t_start = self.t[self.time]
+            if t_start >= self.lupdate_t + self.update_period: # same form as t_end, to avoid empty segments
+                self.update_lifetimes(t_start)
+                self.lupdate_t = self.t[self.time]
+            # integrate up to the next lifetime update or discrete event
+            t_end = min(self.lupdate_t + self.update_period, self.next_event_time(t_start))
+            if T - t_end <= 1e-12*max(abs(T), 1) : t_end = T # don't leave a vanishingly short last segment
+            sol = solve_ivp(lambda t, x : self.dxdt_state(x, upper), (t_start, t_end), self.get_state(self.time), method=method,
+                            rtol=rtol, atol=atol, jac=jac, dense_output=(dt_out is not None))
+            if not sol.success:
+                print('WARNING : solve_ivp failed, ' + sol.message)
+                return
+            if dt_out is None:
+                t_save, x_save = sol.t[1:], sol.y[:,1:]
+            else:
+                t_save = np.arange(np.floor(t_start/dt_out) + 1, np.ceil(t_end/dt_out))*dt_out
+                t_save = np.append(t_save[(t_save > t_start) & (t_save < t_end)], t_end)
+                x_save = sol.sol(t_save)
+
+            # save the results
+            self.grow_history(self.time + 1 + t_save.size)
+            for i in range(t_save.size):
+                self.set_state(self.time + 1, x_save[:,i])
+                self.t[self.time + 1] = t_save[i]
+                self.time += 1
+                if i < t_save.size - 1 : yield
+            self.sim_events() # run discrete events
+            yield
+
+    def jacobian_state(self, x):
+        '''
+        calculates the Jacobian of the rates of change for an arbitrary state vector, using the current lifetimes
+
+        Parameter(s):
+        x : state vector, in the format given by get_state (array)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        J : Jacobian, in the format given by jacobian (scipy csr_matrix, 1/yr)
+
+        Note(s): uses the space in the history after the current time as scratch space
+        '''
+
+        self.grow_history(self.time + 2)
+        self.set_state(self.time + 1, x)
+        return self.jacobian(self.time + 1)
+
+    def next_event_time(self, t):
+        '''
+        finds the next time after t that a discrete event is scheduled for
+
+        Parameter(s):
+        t : time to search from (yr)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        t_next : time of the next event, or np.inf if there is none (yr)
+
+        Note(s): only events with a list of times are considered
+        '''
+
+        t_next = np.inf
+        for cell in self.cells:
+            for event in cell.event_list:
+                if event.time is not None:
+                    later = [event_t for event_t in event.time if event_t > t]
+                    if len(later) > 0 : t_next = min(t_next, min(later))
+        return t_next
+
+    def solve_steady_state(self, setF107=None, x0=None, tol=1e-8, max_iter=50, upper=True):
+        '''
+        finds the equilibrium (steady state) of the system, where the rates of change of every population are zero,
+        using Newton's method with the analytic Jacobian
+
+        Parameter(s): None
+
+        Keyword Parameter(s):
+        setF107 : if not None, solar flux used for the drag lifetimes while solving, i.e. a time-averaged value
+                  (None or 10^(-22)W/m^2, default None)
+        x0 : initial guess, in the format given by get_state, or None to use the equilibrium of the linear terms
+             alone (array, default None)
+        tol : the solver stops when the largest Newton step is below tol relative to the size of each value
+              (default 1e-8)
+        max_iter : maximum number of Newton iterations (default 50)
+        upper : whether or not to have debris come into the top shell (bool, default True)
+
+        Output(s):
+        S : equilibrium number of live satellites of each type in each shell (2-d array)
+        S_d : equilibrium number of de-orbiting satellites of each type in each shell (2-d array)
+        D : equilibrium number of derelict satellites of each type in each shell (2-d array)
+        R : equilibrium number of rocket bodies of each type in each shell (2-d array)
+        N : equilibrium number of debris in each bin of each shell (3-d array)
+        converged : whether or not the solver converged (bool)
+        residual : largest remaining rate of change at the solution (1/yr)
+
+        Note(s): if setF107 is None, the current drag lifetimes are used. otherwise, the lifetimes are calculated
+        with the given flux, then returned to their previous values afterwards. the collision counts are ignored,
+        and the values in the system are not changed. steps are cut back if they don't reduce the rates of change
+        '''
+
+        if setF107 is not None: # get lifetimes with the given solar flux
+            old_F107 = self.setF107
+            self.setF107 = setF107
+            self.update_lifetimes(self.t[self.time])
+        num_pop = self.get_state(self.time).size - 2*self.num_cells # number of values solved for
+        converged = False
+
+        try:
+            if x0 is None: # start from the equilibrium of the linear terms
+                x = np.zeros(num_pop + 2*self.num_cells)
+                A = self.linear_rates()[:num_pop,:num_pop].tocsc()
+                x[:num_pop] = splu(A).solve(-self.dxdt_state(x, upper)[:num_pop])
+            else:
+                x = np.array(x0, dtype=np.double)
+            f = self.dxdt_state(x, upper)[:num_pop]
+            for _ in range(max_iter):
+                J = self.jacobian_state(x)[:num_pop,:num_pop].tocsc()
+                dx = splu(J).solve(-f)
+                step = 1
+                while True: # cut back the step until the rates of change are reduced
+                    x_new = x.copy()
+                    x_new[:num_pop] += step*dx
+                    f_new = self.dxdt_state(x_new, upper)[:num_pop]
+                    if np.amax(np.abs(f_new)) < np.amax(np.abs(f)) or step < 1e-3 : break
+                    step /= 2
+                x, f = x_new, f_new
+                if np.amax(np.abs(step*dx)/np.maximum(np.abs(x[:num_pop]), 1)) <= tol:
+                    converged = True
+                    break
+        except RuntimeError: # singular Jacobian, i.e. some population has no way to leave the system
+            f = np.full(num_pop, np.inf)
+
+        if not converged : print('WARNING : Steady state solver did not converge')
+        if setF107 is not None: # go back to the old lifetimes
+            self.setF107 = old_F107
+            self.update_lifetimes(self.lupdate_t)
+        S, S_d, D, R, N, _, _ = self.split_state(x.copy())
+        return S, S_d, D, R, N, converged, np.amax(np.abs(f))
+
+    def validate_dtype(self, T, method='run_sim_euler', **kwargs):
+        '''
+        runs copies of the system with the current floating point type and with double precision, and reports
+        how far apart the final values are, without changing this NCell
+
+        Parameter(s):
+        T : length of the simulations (yr)
+
+        Keyword Parameter(s):
+        method : name of the run_sim method to use (string, default 'run_sim_euler')
+        any other keyword arguments are passed to the run_sim method
+
+        Output(s):
+        deviation : largest relative deviation of the final S, S_d, D, R, and N values from the double precision
+                    run, for each of those keys (dict)
+
+        Note(s): the deviation is relative to the double precision values, or to one object where they are smaller.
+        adaptive methods may end at slightly different times, so a fixed time step method is best for this
+        '''
+
+        run, ref = deepcopy(self), deepcopy(self)
+        ref.set_dtype(np.double)
+        getattr(run, method)(T, **kwargs)
+        getattr(ref, method)(T, **kwargs)
+        if run.t[run.time] != ref.t[ref.time]:
+            print('WARNING : Runs ended at different times, ' + str(run.t[run.time]) + 'yr and ' + str(ref.t[ref.time]) + 'yr')
+        deviation = {}
+        for key, x, x_ref in zip(['S', 'S_d', 'D', 'R', 'N'], run.split_state(run.get_state(run.time)), ref.split_state(ref.get_state(ref.time))):
+            deviation[key] = np.amax(np.abs(x - x_ref)/np.maximum(np.abs(x_ref), 1), initial=0)
+        print('Deviation from double precision : ' + ', '.join(key + ' ' + '%.3g' % dev for key, dev in deviation.items()))
+        return deviation
 
     def sim_colls(self, dNdt, rate, m_1, m_2, indx, typ):
         '''
@@ -882,9 +2605,9 @@ class NCell:
         Lmin, Lmax = 10**self.logL_edges[0], 10**self.logL_edges[-1] # min and max characteristic lengths
         N_debris = np.sum(calc_Ntot(M, Lmin, Lmax, 'coll')*rate) # total rate of debris creation
         if typ == 'sat':
-            dNdt += self.sat_coll_probability_tables[indx,:,:,:]*N_debris
+            dNdt += self.prob_table_row(self.sat_coll_probability_tables, indx)*N_debris
         elif typ == 'rb':
-            dNdt += self.sat_coll_probability_tables[indx,:,:,:]*N_debris
+            dNdt += self.prob_table_row(self.sat_coll_probability_tables, indx)*N_debris
 
     def sim_colls_satrb(self, dNdt, rate, m, indx, typ):
         '''
@@ -909,11 +2632,11 @@ class NCell:
         if typ == 'sat':
             # total rate of debris creation, we sum over num_rb_types to get debris produced for each type of collision
             N_debris = np.sum(calc_Ntot(m, Lmin, Lmax, 'coll')*np.sum(rate, axis=1))
-            dNdt += self.sat_coll_probability_tables[indx,:,:,:]*N_debris
+            dNdt += self.prob_table_row(self.sat_coll_probability_tables, indx)*N_debris
         elif typ == 'rb':
             # total rate of debris creation, we sum over num_sat_types to get debris produced for each type of collision
             N_debris = np.sum(calc_Ntot(m, Lmin, Lmax, 'coll')*np.sum(rate,axis=0))
-            dNdt += self.sat_coll_probability_tables[indx,:,:,:]*N_debris
+            dNdt += self.prob_table_row(self.sat_coll_probability_tables, indx)*N_debris
 
     def sim_expl(self, dNdt, rate, C, indx, typ):
         '''
@@ -935,9 +2658,9 @@ class NCell:
         Lmin, Lmax = 10**self.logL_edges[0], 10**self.logL_edges[-1] # min and max characteristic lengths
         N_debris = np.sum(calc_Ntot(0, Lmin, Lmax, 'expl', C=C)*rate) # total rate of debris creation
         if typ == 'sat':
-            dNdt += self.sat_expl_probability_tables[indx,:,:,:]*N_debris
+            dNdt += self.prob_table_row(self.sat_expl_probability_tables, indx)*N_debris
         elif typ == 'rb':
-            dNdt += self.rb_expl_probability_tables[indx,:,:,:]*N_debris
+            dNdt += self.prob_table_row(self.rb_expl_probability_tables, indx)*N_debris
 
     def sim_events(self):
         '''
@@ -947,10 +2670,12 @@ class NCell:
 
         Keyword Input(s): None
 
-        Output(s): None
+        Output(s):
+        changed : whether or not any events were run, i.e. if the values at the current time may have changed (bool)
         '''
 
         dN = np.zeros((self.num_cells, self.num_L, self.num_chi)) # debris change matrix
+        changed = False
 
         for i in range(self.num_cells):
 
@@ -968,6 +2693,7 @@ class NCell:
                 if event.time is not None: # events at specific times
                     while event.time != [] and event.time[0] <= self.t[self.time]:
                         dS_temp, dS_d_temp, dD_temp, dR_temp, dN_loc_temp, coll_temp, expl_temp = event.run_event(S, S_d, D, R, N, self.logL_edges, self.chi_edges)
+                        changed = True
                         event.time.pop(0)
                         dS += dS_temp
                         dS_d += dS_d_temp
@@ -980,6 +2706,7 @@ class NCell:
                 if event.freq is not None: # events occuring at specific frequencies
                     if self.t[self.time] - event.last_event <= event.freq:
                         dS_temp, dS_d_temp, dD_temp, dR_temp, dN_loc_temp, coll_temp, expl_temp = event.run_event(S, S_d, D, R, N, self.logL_edges, self.chi_edges)
+                        changed = True
                         dS += dS_temp
                         dS_d += dS_d_temp
                         dD += dD_temp
@@ -1004,6 +2731,8 @@ class NCell:
             curr_cell = self.cells[i]
             curr_cell.N_bins[self.time] += dN[i,:,:]
 
+        return changed
+
     def parse_coll(self, dN, coll_list, i):
         '''
         parses and runs discrete collision events, storing the debris generated in dN
@@ -1051,8 +2780,20 @@ class NCell:
         Keyword Input(s): None
 
         Output(s): None
+
+        Note(s): with the numba backend, all lifetimes are found in one call to NumbaKernels.drag_lifetimes
         '''
 
+        if self.backend == 'numba':
+            AM = np.concatenate((self.AM_sat, self.AM_rb, np.broadcast_to(self.AM_ave, self.tau_N.shape)), axis=1)
+            alt_top = np.broadcast_to((self.alts + self.dhs/2)[:,None], AM.shape).ravel()
+            alt_bot = np.broadcast_to((self.alts - self.dhs/2)[:,None], AM.shape).ravel()
+            tau = drag_lifetimes(alt_top, alt_bot, AM.ravel(), self.CD, 1/365.25, self.m0 + t*12, self.min_dt,
+                                 np.inf if self.max_dt is None else self.max_dt, self.dtfactor,
+                                 np.inf if self.t_max is None else self.t_max, -1. if self.setF107 is None else self.setF107)
+            self.tau_sat[:], self.tau_rb[:], self.tau_N[:] = np.split(tau.reshape(AM.shape), [self.num_sat_types, self.num_sat_types + self.num_rb_types], axis=1)
+            return
+
         for i in range(self.num_cells): # iterate through cells
             curr_cell = self.cells[i]
             alt = curr_cell.alt
@@ -1079,11 +2820,11 @@ class NCell:
         array of t values (yr)
         '''
 
-        return self.t
+        return self.t[:self.time+1].copy()
     
     def get_S(self):
         '''
-        returns list of lists of lists for number of live satellites in each shell
+        returns list of lists of arrays for number of live satellites in each shell
 
         Parameter(s): None
 
@@ -1093,18 +2834,11 @@ class NCell:
         list of array of S values for each cell of each type, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            to_return.append([])
-            for j in range(cell.num_sat_types):
-                to_return[-1].append([])
-                for k in range(self.time+1):
-                    to_return[-1][j].append(cell.S[k][j])
-        return to_return
+        return list(self.S[:self.time+1].transpose(1, 2, 0).copy())
 
     def get_SD(self):
         '''
-        returns list of lists of lists for number of de-orbiting satellites in each shell
+        returns list of lists of arrays for number of de-orbiting satellites in each shell
 
         Parameter(s): None
 
@@ -1114,18 +2848,11 @@ class NCell:
         list of array of S_d values for each cell of each type, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            to_return.append([])
-            for j in range(cell.num_sat_types):
-                to_return[-1].append([])
-                for k in range(self.time+1):
-                    to_return[-1][j].append(cell.S_d[k][j])
-        return to_return
+        return list(self.S_d[:self.time+1].transpose(1, 2, 0).copy())
 
     def get_D(self):
         '''
-        returns list of lists of lists for number of derelict satellites in each shell
+        returns list of lists of arrays for number of derelict satellites in each shell
 
         Parameter(s): None
 
@@ -1135,18 +2862,11 @@ class NCell:
         list of array of D values for each cell of each type, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            to_return.append([])
-            for j in range(cell.num_sat_types):
-                to_return[-1].append([])
-                for k in range(self.time+1):
-                    to_return[-1][j].append(cell.D[k][j])
-        return to_return
+        return list(self.D[:self.time+1].transpose(1, 2, 0).copy())
 
     def get_R(self):
         '''
-        returns list of lists of lists for number of rocket bodies in each shell
+        returns list of lists of arrays for number of rocket bodies in each shell
 
         Parameter(s): None
 
@@ -1156,14 +2876,7 @@ class NCell:
         list of array of R values for each cell of each type, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            to_return.append([])
-            for j in range(cell.num_rb_types):
-                to_return[-1].append([])
-                for k in range(self.time+1):
-                    to_return[-1][j].append(cell.R[k][j])
-        return to_return
+        return list(self.R[:self.time+1].transpose(1, 2, 0).copy())
 
     def get_N(self):
         '''
@@ -1177,13 +2890,7 @@ class NCell:
         list of array of total N values for each cell, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            N = []
-            for i in range(len(cell.N_bins)):
-                N.append(np.sum(cell.N_bins[i]))
-            to_return.append(np.array(N))
-        return to_return
+        return list(np.sum(self.N_bins[:self.time+1], axis=(2,3)).transpose())
 
     def get_C(self):
         '''
@@ -1197,10 +2904,7 @@ class NCell:
         list of array of total C values for each cell, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            to_return.append(np.array(cell.C_c) + np.array(cell.C_nc))
-        return to_return
+        return list((self.C_c[:self.time+1] + self.C_nc[:self.time+1]).transpose())
     
     def get_Cc(self):
         '''
@@ -1214,10 +2918,7 @@ class NCell:
         list of array of C_c values for each cell, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            to_return.append(cell.C_c)
-        return to_return
+        return list(self.C_c[:self.time+1].transpose().copy())
 
     def get_Cnc(self):
         '''
@@ -1231,10 +2932,7 @@ class NCell:
         list of array of C_nc values for each cell, in order of ascending altitude
         '''
 
-        to_return = []
-        for cell in self.cells:
-            to_return.append(cell.C_nc)
-        return to_return
+        return list(self.C_nc[:self.time+1].transpose().copy())
 
     def alt_to_index(self, h):
         '''
@@ -0,0 +1,313 @@
+# contains class for running many scenarios of the same NCell system at once
+
+from NCell import *
+import numpy as np
+
+class NCellEnsemble:
+
+    # parameters that can be different in each scenario, stored with a leading scenario axis
+    scenario_param_keys = ['lam_sat', 'lam_rb', 'alpha_S', 'alpha_D', 'alpha_R', 'alpha_N', 'P', 'expl_rate_L',
+                           'expl_rate_D', 'expl_rate_R']
+
+    # collision yield tables weighted by the collision factors (see NCell.update_yield_tables)
+    yield_fac_keys = ['SS_yield_fac', 'SSd_yield_fac', 'SD_yield_fac', 'DD_yield_fac', 'RR_yield_fac']
+
+    # the rate calculations are shared with NCell, and work with the leading scenario axis
+    dxdt_cells_values = NCell.dxdt_cells_values
+    dxdt_values = NCell.dxdt_values
+
+    def __init__(self, atmos, scenarios):
+        '''
+        constructor for NCellEnsemble class
+
+        Parameter(s):
+        atmos : NCell giving the shells, probability tables, drag lifetimes, and initial values shared by every
+                scenario (NCell)
+        scenarios : parameters of each scenario, as dictionaries with any of the keys in scenario_param_keys,
+                    giving values that can be broadcast to the shape of that NCell attribute. missing keys use the
+                    value from atmos (list of dicts)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        NCellEnsemble instance
+
+        Note(s): the names are those of the stacked NCell parameters, i.e. 'alpha_N' with shape (cell, type), and
+        each is set independently (setting alpha_N doesn't change alpha_D or alpha_R). any other attribute is
+        taken from atmos, which is used (and changed) when updating the drag lifetimes. discrete events are
+        not supported
+        '''
+
+        self.atmos = atmos
+        self.num_scenarios = len(scenarios)
+        for cell in atmos.cells:
+            if len(cell.event_list) > 0:
+                print('WARNING : Discrete events are ignored by NCellEnsemble')
+                break
+
+        # stack the scenario parameters
+        for key in self.scenario_param_keys:
+            value = getattr(atmos, key)
+            setattr(self, key, np.array([np.broadcast_to(scenario.get(key, value), value.shape) for scenario in scenarios],
+                                        dtype=np.double))
+        for scenario in scenarios:
+            for key in scenario:
+                if key not in self.scenario_param_keys:
+                    print('WARNING : Unknown scenario parameter ' + key + ', it will be ignored')
+        self.update_coll_factors()
+
+        # history, only kept at the times every scenario is synchronized at
+        x = atmos.get_state(atmos.time).astype(np.double)
+        self.t = [atmos.t[atmos.time]]
+        self.X = [np.tile(x, (self.num_scenarios, 1))]
+        self.time = 0 # index of the current time
+        self.lupdate_t = atmos.lupdate_t # last time drag lifetimes were updated (yr)
+
+    def __getattr__(self, name):
+        '''
+        takes any attribute that isn't specific to the ensemble from the underlying NCell
+
+        Parameter(s):
+        name : name of the attribute
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        value of the attribute in atmos
+        '''
+
+        if name == 'atmos' : raise AttributeError(name) # not set up yet, i.e. while unpickling
+        return getattr(self.atmos, name)
+
+    def update_coll_factors(self):
+        '''
+        updates the collision rate factors that depend on the scenario parameters, with the leading scenario
+        axis
+
+        Parameter(s): None
+
+        Keyword Parameter(s): None
+
+        Output(s): None
+
+        Note(s): needs to be called again if the collision avoidance fractions are changed
+        '''
+
+        a = self.atmos
+        factors = calc_coll_factors(a.sigma_sat_km, a.sigma_rb_km, self.alpha_S, self.alpha_D, self.alpha_R, self.alpha_N,
+                                    a.trackable, a.v, a.v_kyr, a.V)
+        for key, factor in zip(a.coll_factor_keys, factors):
+            setattr(self, key, factor)
+        # pair yields weighted by the collision factors, as in NCell.update_yield_tables
+        yield_SS_low = np.where(a.double_count_filter_sat, 0, a.yield_SS)
+        self.SS_yield_fac = yield_SS_low*self.SS_fac
+        self.SSd_yield_fac = a.yield_SS*self.SSd_fac
+        self.SD_yield_fac = a.yield_SS*self.SD_fac
+        self.DD_yield_fac = yield_SS_low*self.DD_fac
+        self.RR_yield_fac = np.where(a.double_count_filter_rb, 0, a.yield_RR)*self.RR_fac
+
+    def split_state(self, X):
+        '''
+        splits state vectors (or vectors of rates of change) back into arrays for each value
+
+        Parameter(s):
+        X : state vectors, in the format given by NCell.get_state, with leading axes (array)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        S, S_d, D, R, N, C_c, C_nc : values in the format of one time of the NCell history arrays, with the
+                                     leading axes of X (arrays, views into X)
+        '''
+
+        a = self.atmos
+        lead = X.shape[:-1]
+        num_sat, num_rb = a.num_cells*a.num_sat_types, a.num_cells*a.num_rb_types
+        num_N = a.num_cells*a.num_L*a.num_chi
+        parts = np.split(X, np.cumsum([num_sat, num_sat, num_sat, num_rb, num_N, a.num_cells]), axis=-1)
+        shapes = [a.S.shape[1:]]*3 + [a.R.shape[1:], a.N_bins.shape[1:], a.C_c.shape[1:], a.C_nc.shape[1:]]
+        return tuple(part.reshape(lead + shape) for part, shape in zip(parts, shapes))
+
+    def dxdt_state(self, X, upper=True):
+        '''
+        calculates the rates of change for the state vectors of a set of scenarios, all in one call
+
+        Parameter(s):
+        X : state vectors, in the format given by NCell.get_state, one row for each scenario (2-d array)
+
+        Keyword Parameter(s):
+        upper : whether or not to have debris come into the top shell (bool, default True)
+
+        Output(s):
+        dXdt : rates of change of every value in the state vectors (2-d array, 1/yr)
+
+        Note(s): X can also be a subset of the rows of the current state, as long as it's given as a
+        (scenario, value) array and the parameters are taken for the same rows (see rows)
+        '''
+
+        S, S_d, D, R, N, _, _ = self.split_state(X)
+        rates = self.dxdt_values(S, S_d, D, R, N, upper)
+        return np.concatenate([rate.reshape(X.shape[0], -1) for rate in rates], axis=1)
+
+    def rows(self, idx):
+        '''
+        builds a view of the ensemble with only the given scenarios, sharing everything else
+
+        Parameter(s):
+        idx : indices of the scenarios to keep (array of ints)
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        sub : NCellEnsemble with only those scenarios, and no history
+        '''
+
+        sub = NCellEnsemble.__new__(NCellEnsemble)
+        sub.atmos = self.atmos
+        sub.num_scenarios = len(idx)
+        for key in self.scenario_param_keys + self.atmos.coll_factor_keys + self.yield_fac_keys:
+            value = getattr(self, key)
+            setattr(sub, key, value[idx] if value.ndim > getattr(self.atmos, key).ndim else value) # only split per-scenario values
+        return sub
+
+    def run_sim_rk(self, T, dt_i=1, dt_min=0, dt_max=1, rtol=1e-3, atol=1e-2, method='DP45', upper=True):
+        '''
+        simulates the evolution of every scenario for T years using an adaptive, embedded Runge-Kutta method,
+        with a separate time step for each scenario
+
+        Parameter(s):
+        T : length of the simulation (yr)
+
+        Keyword Parameter(s):
+        dt_i : initial timestep used by the simulation (yr, default 1)
+        dt_min : minimum time step used by the simulation is (yr, default 0)
+        dt_max : maximum time step used by simulation (yr, default 1)
+        rtol : relative tolerance for the adaptive time step, in the format used by NCell.run_sim_rk (float or
+               dict, default 1e-3)
+        atol : absolute tolerance for the adaptive time step, in the same format as rtol (float or dict, default 1e-2)
+        method : Runge-Kutta pair to use, either 'DP45' or 'BS23' (default 'DP45')
+        upper : whether or not to have debris come into the top shell (bool, default True)
+
+        Output(s): None
+
+        Note(s): each scenario controls its own time step and accepts or rejects steps on its own, with the
+        scenarios that are still stepping evaluated together and the rest masked out. all scenarios stop at
+        every drag lifetime update, so the lifetimes are calculated once for all of them, and the values at
+        these times are added to the history. the collision counts are not used for step size control. a
+        scenario that gives non-finite values at dt_min, or whose time step gets too small to advance it, is
+        stopped with its values set to NaN, and the rest carry on
+        '''
+
+        A, b, b_err, q = NCell.rk_tableaux[method]
+        e = b - b_err # weights for the error estimate
+        a = self.atmos
+        num_pop = self.X[self.time].shape[1] - 2*a.num_cells # number of values used for error control
+        rtol_vec, atol_vec = a.state_tol(rtol, 1e-3), a.state_tol(atol, 1e-2)
+        warning_given = False # whether or not a warning has been given yet
+        X = self.X[self.time].copy()
+        t = np.full(self.num_scenarios, self.t[self.time]) # time of each scenario
+        dt = np.full(self.num_scenarios, dt_i, dtype=np.double)
+        K_first = np.empty(X.shape) # rates of change at the current values, re-used while valid
+        fresh = np.full(self.num_scenarios, False) # which scenarios have valid values in K_first
+        failed = np.full(self.num_scenarios, False) # scenarios that can't be continued
+        t_update = self.lupdate_t + self.update_period # next time the drag lifetimes are updated
+
+        while self.t[self.time] < T:
+            # compared with a tolerance, since t_update - lupdate_t can round to just below update_period
+            if self.t[self.time] >= t_update - 1e-12*max(abs(t_update), 1):
+                a.update_lifetimes(self.t[self.time])
+                self.lupdate_t = self.t[self.time]
+                t_update = self.lupdate_t + self.update_period
+                fresh[:] = False
+            t_sync = min(t_update, T) # next time every scenario stops at
+            if T - t_sync <= 1e-12*max(abs(T), 1) : t_sync = T # don't leave a vanishingly short last segment
+
+            while True:
+                act = np.nonzero((t_sync - t > 1e-12*max(abs(t_sync), 1)) & ~failed)[0] # scenarios still stepping
+                if act.size == 0 : break
+                sub = self.rows(act)
+                x = X[act]
+                h = np.minimum(dt[act], t_sync - t[act])[:,None]
+                new = act[~fresh[act]]
+                if new.size > 0 : K_first[new] = self.rows(new).dxdt_state(X[new], upper)
+                K = np.empty((b.size,) + x.shape)
+                K[0] = K_first[act]
+                for i in range(1, b.size):
+                    x_stage = x + h*np.tensordot(A[i,:i], K[:i], axes=1)
+                    K[i] = sub.dxdt_state(x_stage, upper)
+                # the last stage is at the new values, compare it to the embedded solution
+                err_vec = np.abs(np.tensordot(e, K[:,:,:num_pop], axes=1))
+                err = h[:,0]*np.amax(err_vec/(atol_vec + rtol_vec*np.maximum(np.abs(x[:,:num_pop]), np.abs(x_stage[:,:num_pop]))), axis=1)
+                err[~np.isfinite(err)] = np.inf # steps giving NaN or infinite values are always rejected
+                new_dt = np.minimum(h[:,0]*np.minimum(5, np.maximum(0.2, 0.9*np.maximum(err, 1e-10)**(-1/(q+1)))), dt_max)
+                forced = (err > 1) & (h[:,0] <= dt_min)
+                # scenarios that can't get a finite value at dt_min, or whose step no longer moves them forwards
+                stuck = (forced & np.isinf(err)) | (h[:,0] <= 1e-12*np.maximum(np.abs(t[act]), 1))
+                if np.any(stuck):
+                    print('WARNING : Scenario(s) ' + str(act[stuck].tolist()) + ' could not be continued past t = ' +
+                          str(np.amin(t[act[stuck]])) + ', their values are set to NaN')
+                    failed[act[stuck]] = True
+                    X[act[stuck]] = np.nan
+                forced &= ~stuck
+                if np.any(forced) and not warning_given:
+                    print('WARNING : Time step is below dt_min, error tolerance may not be met')
+                    warning_given = True
+                accept = ((err <= 1) | forced) & ~stuck
+                new_dt[forced] = dt_min
+
+                # move the accepted scenarios forwards, the last stage is the first stage of their next step
+                done = act[accept]
+                X[done], t[done] = x_stage[accept], t[done] + h[accept,0]
+                K_first[done] = K[-1][accept]
+                fresh[done] = True
+                dt[act] = np.where(accept, new_dt, np.maximum(new_dt, dt_min))
+
+            t[:] = t_sync
+            self.t.append(t_sync)
+            self.X.append(X.copy())
+            self.time += 1
+
+    def get_t(self):
+        '''
+        returns array of times in the history
+
+        Parameter(s): None
+
+        Keyword Parameter(s): None
+
+        Returns:
+        array of t values (yr)
+        '''
+
+        return np.array(self.t[:self.time+1])
+
+    def get_state(self, time):
+        '''
+        returns the state vectors of every scenario at the given time
+
+        Parameter(s):
+        time : time (index) of the values to be used
+
+        Keyword Parameter(s): None
+
+        Output(s):
+        X : state vectors, in the format given by NCell.get_state, one row for each scenario (2-d array)
+        '''
+
+        return self.X[time].copy()
+
+    def snapshots(self, time, full_state=False):
+        '''
+        builds a snapshot of every scenario at the given time
+
+        Parameter(s):
+        time : time (index) of the values to be used
+
+        Keyword Parameter(s):
+        full_state : if True, the full arrays are given, instead of totals for each shell (bool, default False)
+
+        Output(s):
+        snapshots : snapshot of each scenario, in the format given by NCell.snapshot (list of dicts)
+        '''
+
+        return [self.atmos.snapshot(self.t[time], x, full_state) for x in self.X[time]]
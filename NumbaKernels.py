@@ -0,0 +1,133 @@
+# compiled versions of the atmospheric drag calculations, used by NCell with backend='numba'
+
+import numpy as np
+from AtmosphericDecayModels import G, Me, Re, logdenL, logdenM, logdenHL, logz, f107_mo
+
+try:
+    from numba import njit
+    numba_available = True
+except ImportError: # kernels are left as plain python, NCell falls back to the numpy backend
+    numba_available = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) : return args[0]
+        return lambda f : f
+
+@njit(cache=True)
+def density_kernel(alt, t, mo0, setF107):
+    '''
+    Calculates the atmospheric density at a given altitude via interpolation, same as AtmosphericDecayModels.density
+
+    Parameter(s):
+    alt : altitude (km)
+    t : time since arbitrary start point (yr)
+    mo0 : starting month in the solar cycle
+    setF107 : if non-negative, value taken for solar flux regardless of current time (10^(-22)W/m^2)
+
+    Output(s):
+    rho : atmospheric density at the given altitude and time (kg/m^3)
+    '''
+
+    i = int((alt-100)/20) # calculate index for altitude
+    if i > logz.size-2 : i = logz.size-2
+    if i < 0 : i = 0
+    logalt = np.log10(alt) + 3 # convert to m
+
+    mo = (t*12 + mo0) % 144
+    moID = int(mo)
+    if setF107 < 0: # get flux value
+        moID1 = moID+1
+        if moID1 > 143 : moID1 = 0
+        F107 = f107_mo[moID] + (f107_mo[moID1]-f107_mo[moID])*(mo-moID)
+    else : F107 = setF107
+
+    frac = (logalt-logz[i])/(logz[i+1]-logz[i]) # interpolate to get density value
+    dL = 10.**(logdenL[i] + (logdenL[i+1]-logdenL[i])*frac)
+    dM = 10.**(logdenM[i] + (logdenM[i+1]-logdenM[i])*frac)
+    dHL = 10.**(logdenHL[i] + (logdenHL[i+1]-logdenHL[i])*frac)
+    if F107 <= 65 : return dL
+    elif F107 <= 140 : return dL + (dM-dL)*(F107-65.)/75.
+    elif F107 <= 250 : return dM + (dHL-dM)*(F107-140.)/110.
+    else : return dHL
+
+@njit(cache=True)
+def dadt_kernel(alt, t, m0, a_over_m, CD, setF107):
+    '''
+    Calculates the rate of change in the altitude of a circular orbit, same as AtmosphericDecayModels.dadt
+
+    Parameter(s):
+    alt : altitude of the orbit (km)
+    t : time passed since the start of the solar cycle (yr)
+    m0 : starting month in the solar cycle
+    a_over_m : area-to-mass ratio of the object (m^2/kg)
+    CD : drag coefficient of the object
+    setF107 : if non-negative, value taken for solar flux regardless of current time (10^(-22)W/m^2)
+
+    Outputs:
+    dadt value (km/yr)
+    '''
+
+    return -(CD*density_kernel(alt, t, m0, setF107)*a_over_m*np.sqrt(G*Me*(alt + Re)*1e3))*60*60*24*365.25*1e-3
+
+@njit(cache=True)
+def drag_lifetime_kernel(alt_i, alt_f, a_over_m, CD, dt, m0, mindt, maxdt, dtfactor, tmax, setF107):
+    '''
+    Estimates the drag lifetime of an object at altitude alt_i to degrade to altitude alt_f, same as
+    AtmosphericDecayModels.drag_lifetime
+
+    Parameter(s):
+    alt_i : initial altitude of the object (km)
+    alt_f : desired final altitude of the object (km)
+    a_over_m : area-to-mass ratio of the object (m^2/kg)
+    CD : drag coefficient of the object
+    dt : initial time step of the integration (yr)
+    m0 : starting month in the solar cycle
+    mindt : minimum time step for integration (yr)
+    maxdt : maximum time step of the integration (yr, np.inf for no maximum)
+    dtfactor : fraction of altitude/rate of change to take as dt
+    tmax : maximum time to search to (yr, np.inf for no maximum)
+    setF107 : if non-negative, value taken for solar flux regardless of current time (10^(-22)W/m^2)
+
+    Output(s):
+    tau : drag lifetime, possibly infinite (yr)
+    '''
+
+    time = 0.
+    alt = alt_i
+
+    # integrate using predictor-corrector method
+    while alt > alt_f:
+        dadt0 = dadt_kernel(alt, time, m0, a_over_m, CD, setF107)
+        alt1 = alt + dadt0*dt
+        dadt1 = dadt_kernel(alt1, time + dt, m0, a_over_m, CD, setF107)
+        ave_dadt = (dadt0 + dadt1)/2
+        alt += ave_dadt*dt
+        time += dt
+        dt = -(alt/ave_dadt)*dtfactor
+        if dt < mindt:
+            print('WARNING: Problem is possibly too stiff for integrator.')
+            dt = mindt
+        else:
+            dt = min(dt, maxdt)
+        if time > tmax : return np.inf # give up
+
+    return time
+
+@njit(cache=True)
+def drag_lifetimes(alt_i, alt_f, a_over_m, CD, dt, m0, mindt, maxdt, dtfactor, tmax, setF107):
+    '''
+    Estimates the drag lifetimes of many objects at once with drag_lifetime_kernel
+
+    Parameter(s):
+    alt_i : initial altitude of each object (1-d array, km)
+    alt_f : desired final altitude of each object (1-d array, km)
+    a_over_m : area-to-mass ratio of each object (1-d array, m^2/kg)
+    remaining parameters are the same as in drag_lifetime_kernel
+
+    Output(s):
+    tau : drag lifetime of each object, possibly infinite (1-d array, yr)
+    '''
+
+    tau = np.empty(a_over_m.size)
+    for i in range(a_over_m.size):
+        tau[i] = drag_lifetime_kernel(alt_i[i], alt_f[i], a_over_m[i], CD, dt, m0, mindt, maxdt, dtfactor, tmax, setF107)
+    return tau
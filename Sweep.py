@@ -0,0 +1,211 @@
+# contains functions for running an NCell over a grid of parameters in a process pool, with results kept in
+# a store that lets an interrupted sweep be picked up where it left off
+
+from NCell import *
+import numpy as np
+from multiprocessing import Pool
+from copy import deepcopy
+from itertools import product
+import traceback
+import time
+import os
+import csv
+import pickle
+
+_worker = {} # sweep settings in each worker process, set by _init_worker
+
+def set_params(atmos, params):
+    '''
+    sets parameters of an NCell for one scenario of a sweep
+
+    Parameter(s):
+    atmos : NCell to change
+    params : new parameter values, keyed by the name of the NCell attribute (i.e. 'lam_sat', 'alpha_N', 'P'), giving
+             values that can be broadcast to the shape of that attribute (dict)
+
+    Keyword Parameter(s): None
+
+    Output(s): None
+
+    Note(s): the names are those of the stacked NCell parameters, so each is set independently (setting alpha_N
+    doesn't change alpha_D or alpha_R)
+    '''
+
+    for key, value in params.items():
+        current = getattr(atmos, key)
+        dtype = current.dtype if current.dtype == bool else np.double
+        setattr(atmos, key, np.array(np.broadcast_to(value, current.shape), dtype=dtype))
+    atmos.update_coll_factors() # also points the Cells at the new parameters
+
+def scenario_params(grids):
+    '''
+    lists the parameters of every scenario in a sweep
+
+    Parameter(s):
+    grids : values to use for each parameter, keyed by parameter name (dict of lists)
+
+    Keyword Parameter(s): None
+
+    Output(s):
+    params : parameters of each scenario, every combination of the grid values with the last parameter
+             changing fastest (list of dicts)
+    '''
+
+    keys = list(grids)
+    return [dict(zip(keys, values)) for values in product(*[grids[key] for key in keys])]
+
+def _init_worker(atmos, setup, T, integrator, out_times, kwargs):
+    '''
+    saves the sweep settings in a worker process, so they're only sent once per worker
+    '''
+
+    _worker.update({'atmos' : atmos, 'setup' : setup, 'T' : T, 'integrator' : integrator, 'out_times' : out_times,
+                    'kwargs' : kwargs})
+
+def _run_scenario(task):
+    '''
+    runs one scenario of a sweep in a worker process
+
+    Parameter(s):
+    task : index and parameters of the scenario (tuple)
+
+    Keyword Parameter(s): None
+
+    Output(s):
+    index : index of the scenario
+    result : snapshots at the output times, stacked into arrays (see load_result), None if the run failed
+    run_time : wall-clock time taken by the run (s)
+    error : traceback of the failure, None if the run succeeded
+    '''
+
+    index, params = task
+    start = time.perf_counter()
+    try:
+        atmos = deepcopy(_worker['atmos'])
+        _worker['setup'](atmos, params)
+        snapshots = list(atmos.iter_sim(_worker['T'], integrator=_worker['integrator'], out_times=_worker['out_times'],
+                                        **_worker['kwargs']))
+        result = {key : np.array([snapshot[key] for snapshot in snapshots]) for key in snapshots[0]}
+        return index, result, time.perf_counter() - start, None
+    except Exception:
+        return index, None, time.perf_counter() - start, traceback.format_exc()
+
+def run_sweep(atmos, grids, store_path, T, out_times, integrator='precor', processes=4, setup=set_params, share=True,
+              **kwargs):
+    '''
+    runs an NCell for every combination of the given parameter values in a process pool, saving the results
+    of each scenario as it finishes
+
+    Parameter(s):
+    atmos : base configuration of every scenario (NCell)
+    grids : values to use for each parameter, keyed by parameter name (dict of lists)
+    store_path : directory to keep the results in, scenarios already completed there are skipped (string)
+    T : length of each simulation (yr)
+    out_times : times to save the per-shell totals at (list or array, yr)
+
+    Keyword Parameter(s):
+    integrator : which run_sim method to use, as in NCell.iter_sim (default 'precor')
+    processes : maximum number of worker processes (default 4)
+    setup : function called as setup(atmos, params) on a copy of the base NCell to set up each scenario, must be
+            defined at module level so it can be sent to the workers (function, default set_params)
+    share : whether or not to put the probability tables in shared memory while the sweep runs, see
+            NCell.share_tables (bool, default True)
+    any other keyword arguments are passed to NCell.iter_sim
+
+    Output(s):
+    index : status of every scenario in the store, in the format given by load_sweep (list of dicts)
+
+    Note(s): the store holds grid.pkl with the grids, index.csv with a row for each finished or failed run,
+    and a scenario<index>.npz file with the results of each completed one. failed scenarios are re-run on
+    restart. the base NCell is sent once to each worker, not with every scenario
+    '''
+
+    if not os.path.exists(store_path) : os.makedirs(store_path)
+    grid_path, index_path = os.path.join(store_path, 'grid.pkl'), os.path.join(store_path, 'index.csv')
+    if os.path.exists(grid_path):
+        with open(grid_path, 'rb') as f:
+            saved = pickle.load(f)
+        if list(saved) != list(grids) or any(len(saved[key]) != len(grids[key]) for key in grids) or not all(
+           np.array_equal(a, b) for key in grids for a, b in zip(saved[key], grids[key])):
+            print('ERROR : ' + store_path + ' holds a sweep over different parameters')
+            return None
+    else:
+        with open(grid_path, 'wb') as f:
+            pickle.dump(grids, f)
+
+    params = scenario_params(grids)
+    done = set(row['index'] for row in load_sweep(store_path) if row['status'] == 'done')
+    tasks = [(i, params[i]) for i in range(len(params)) if i not in done]
+    print('Running ' + str(len(tasks)) + ' of ' + str(len(params)) + ' scenarios')
+    if len(tasks) == 0 : return load_sweep(store_path)
+
+    owner = share and atmos.shared_tables is None # only release tables shared here
+    if owner : atmos.share_tables()
+    new_index = not os.path.exists(index_path)
+    failed = 0
+    try:
+        with open(index_path, 'a', newline='') as f, Pool(processes=min(processes, len(tasks)), initializer=_init_worker,
+                                                          initargs=(atmos, setup, T, integrator, np.asarray(out_times), kwargs)) as pool:
+            writer = csv.writer(f)
+            if new_index : writer.writerow(['index', 'status', 'run_time', 'error'] + list(grids))
+            for index, result, run_time, error in pool.imap_unordered(_run_scenario, tasks):
+                if error is None: # results are saved before the index, so a listed scenario is always complete
+                    np.savez(os.path.join(store_path, 'scenario' + str(index) + '.npz'), **result)
+                    print('Scenario ' + str(index) + ' done in ' + str(round(run_time, 2)) + 's')
+                else:
+                    failed += 1
+                    print('Scenario ' + str(index) + ' FAILED after ' + str(round(run_time, 2)) + 's\n' + error)
+                writer.writerow([index, 'done' if error is None else 'failed', run_time, error or ''] +
+                                [str(params[index][key]) for key in grids])
+                f.flush()
+    finally:
+        if owner : atmos.release_tables(unlink=True)
+    print('Sweep done, ' + str(len(tasks) - failed) + ' scenarios completed, ' + str(failed) + ' failed')
+    return load_sweep(store_path)
+
+def load_sweep(store_path):
+    '''
+    loads the status of every scenario run so far in a sweep
+
+    Parameter(s):
+    store_path : directory the sweep results are kept in (string)
+
+    Keyword Parameter(s): None
+
+    Output(s):
+    index : dictionary for each scenario that has been run, with its 'index', 'status' ('done' or 'failed'),
+            'run_time' (s), 'error' (traceback, or '' if it succeeded), and 'params' (dict), sorted by index
+            (list of dicts)
+
+    Note(s): only the latest run of each scenario is given
+    '''
+
+    index_path = os.path.join(store_path, 'index.csv')
+    if not os.path.exists(index_path) : return []
+    with open(os.path.join(store_path, 'grid.pkl'), 'rb') as f:
+        params = scenario_params(pickle.load(f))
+    rows = {}
+    with open(index_path, newline='') as f:
+        for row in csv.DictReader(f):
+            i = int(row['index'])
+            rows[i] = {'index' : i, 'status' : row['status'], 'run_time' : float(row['run_time']), 'error' : row['error'],
+                       'params' : params[i]}
+    return [rows[i] for i in sorted(rows)]
+
+def load_result(store_path, index):
+    '''
+    loads the results of one completed scenario of a sweep
+
+    Parameter(s):
+    store_path : directory the sweep results are kept in (string)
+    index : index of the scenario, as given by load_sweep
+
+    Keyword Parameter(s): None
+
+    Output(s):
+    result : dictionary with the output times 't' (yr), and 'S', 'S_d', 'D', 'R', 'N', 'C_c', and 'C_nc' in
+             each shell at those times, indexed (time, cell) (dict of arrays)
+    '''
+
+    with np.load(os.path.join(store_path, 'scenario' + str(index) + '.npz')) as data:
+        return {key : data[key] for key in data.files}
@@ -18,9 +18,9 @@ def to_run(atmosphere, lamfac=None, alpha=None):
     name = str(lamfac) + "x" + str(alpha)
     T_loc = 1
     while T_loc <= T:
-        atmosphere.run_sim_precor(T_loc, mindtfactor=10000)
+        atmosphere.run_sim_precor(T_loc, dt_min=1e-4, record_every=0.01)
         print(name + " done to T = " + str(T_loc)) 
-        atmosphere.save(directory, name, gap=0.01, force=True)
+        atmosphere.checkpoint(directory, name)
         T_loc += 1
     return True
 
@@ -0,0 +1,45 @@
+import sys
+sys.path.append('./../')
+
+from NCell import NCell
+from NCellEnsemble import NCellEnsemble
+import numpy as np
+
+alt_edges = np.array([500, 550, 600, 650])
+S_i = [[10, 5], [100, 3], [7, 1]]
+S_di = [[1, 2], [3, 0], [0, 1]]
+D_i = [[4, 5], [2, 1], [1, 6]]
+R_i = [[3], [2], [1]]
+N_i = [1000, 2000, 3000]
+target_alts = [800, 550]
+lam = np.array([50, 10])
+lam_factors = [1, 2]
+alphas = [0.05, 0.2]
+T = 0.5 # crosses several drag lifetime updates
+
+def gen_atmosphere(lamfac, alpha):
+    return NCell(S_i, S_di, D_i, N_i, target_alts, alt_edges, (lam*lamfac).tolist(), R_i=R_i, lam_rb=[[1], [0], [2]],
+                 expl_rate_L=[1, 2], expl_rate_R=[1], alphaN=[[alpha]*2]*3, m_s=[250, 1000], num_dir=100, setF107=150)
+
+# every scenario shares the tables of one NCell, only the launch rates and alphas are different. the NCell
+# constructor also sets alphaD and alphaR from alphaN, so all three are set here to match
+params = [(lamfac, alpha) for lamfac in lam_factors for alpha in alphas]
+scenarios = [{'lam_sat' : lam*lamfac, 'alpha_N' : alpha, 'alpha_D' : alpha, 'alpha_R' : alpha} for lamfac, alpha in params]
+ensemble = NCellEnsemble(gen_atmosphere(1, alphas[0]), scenarios)
+dXdt = ensemble.dxdt_state(ensemble.get_state(0))
+ensemble.run_sim_rk(T)
+print('ensemble times :', ensemble.get_t())
+
+# compare to running each scenario on its own
+rate_errs, run_errs = [], []
+for k, (lamfac, alpha) in enumerate(params):
+    atmosphere = gen_atmosphere(lamfac, alpha)
+    ref = atmosphere.dxdt_state(atmosphere.get_state(0))
+    rate_errs.append(np.amax(np.abs(dXdt[k] - ref)/(np.abs(ref) + 1)))
+    atmosphere.run_sim_rk(T)
+    x = atmosphere.get_state(atmosphere.time)
+    run_errs.append(np.amax(np.abs(ensemble.get_state(ensemble.time)[k] - x)/(np.abs(x) + 1)))
+    print(str(lamfac) + "x" + str(alpha), 'relative rate difference :', rate_errs[-1], 'relative final difference :', run_errs[-1])
+print('max rate difference :', max(rate_errs))
+assert max(rate_errs) < 1e-12, 'ensemble rates do not match the separate NCells'
+print('max final difference :', max(run_errs))
@@ -0,0 +1,46 @@
+import sys
+sys.path.append('./../')
+
+from NCell import NCell
+from copy import deepcopy
+import numpy as np
+
+alt_edges = np.array([500, 550, 600, 650])
+S_i = [[10, 5], [100, 3], [7, 1]]
+S_di = [[1, 2], [3, 0], [0, 1]]
+D_i = [[4, 5], [2, 1], [1, 6]]
+R_i = [[3], [2], [1]]
+N_i = [1000, 2000, 3000]
+target_alts = [800, 550]
+lam = [50, 10]
+base = NCell(S_i, S_di, D_i, N_i, target_alts, alt_edges, lam, R_i=R_i, lam_rb=[[1], [0], [2]], expl_rate_L=[1, 2],
+             expl_rate_R=[1], alphaS=[[0.1, 0.2]]*3, m_s=[250, 1000], num_dir=100, setF107=150)
+num_pop = base.get_state(0).size - 2*base.num_cells # leave out the collision counts
+T = 1
+
+def deviation(x, x_ref):
+    return np.amax(np.abs(x[:num_pop] - x_ref[:num_pop])/(np.abs(x_ref[:num_pop]) + 1))
+
+# tight reference run
+ref = deepcopy(base)
+ref.run_sim_ivp(T, method='Radau', rtol=1e-8, atol=1e-6)
+x_ref = ref.get_state(ref.time)
+
+# compare each integrator to the reference. precor needs dt_min > 0 for its first step, and its tolerance is an
+# absolute error (number of objects), so the default of 1 is much looser than the relative tolerances of the others
+runs = {'precor' : ('run_sim_precor', {'dt_min' : 1e-4}), 'rosenbrock' : ('run_sim_rosenbrock', {}), 'rk (DP45)' : ('run_sim_rk', {'method' : 'DP45'}),
+        'rk (BS23)' : ('run_sim_rk', {'method' : 'BS23'}), 'ivp (LSODA)' : ('run_sim_ivp', {}), 'ivp (BDF)' : ('run_sim_ivp', {'method' : 'BDF'}),
+        'split' : ('run_sim_split', {'dt' : 0.01}), 'multirate' : ('run_sim_multirate', {'dt' : 0.01})}
+for name, (method, kwargs) in runs.items():
+    atmosphere = deepcopy(base)
+    getattr(atmosphere, method)(T, **kwargs)
+    print(name, 'steps :', atmosphere.time, 'max relative difference :', deviation(atmosphere.get_state(atmosphere.time), x_ref))
+
+# compare the steady state to a long integration
+atmosphere = deepcopy(base)
+S, S_d, D, R, N, converged, residual = atmosphere.solve_steady_state()
+x_ss = np.concatenate((S.ravel(), S_d.ravel(), D.ravel(), R.ravel(), N.ravel()))
+long_run = deepcopy(base)
+long_run.run_sim_ivp(300, method='BDF', rtol=1e-6, atol=1e-4)
+print('steady state converged :', converged, 'residual :', residual)
+print('steady state max relative difference from 300 years :', deviation(x_ss, long_run.get_state(long_run.time)))
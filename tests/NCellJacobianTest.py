@@ -0,0 +1,41 @@
+import sys
+sys.path.append('./../')
+
+from NCell import NCell
+import numpy as np
+
+alt_edges = np.array([500, 550, 600, 650])
+S_i = [[10, 5], [100, 3], [7, 1]]
+S_di = [[1, 2], [3, 0], [0, 1]]
+D_i = [[4, 5], [2, 1], [1, 6]]
+R_i = [[3], [2], [1]]
+N_i = [1000, 2000, 3000]
+target_alts = [800, 550]
+lam = [50, 10]
+atmosphere = NCell(S_i, S_di, D_i, N_i, target_alts, alt_edges, lam, R_i=R_i, lam_rb=[[1], [0], [2]], expl_rate_L=[1, 2],
+                   expl_rate_R=[1], alphaS=[[0.1, 0.2]]*3, m_s=[250, 1000], num_dir=100, setF107=150)
+atmosphere.run_sim_euler(0.01, dt=0.001)
+
+# compare the analytic Jacobian to central differences
+x = atmosphere.get_state(atmosphere.time)
+J = atmosphere.jacobian(atmosphere.time).toarray()
+J_fd = np.zeros(J.shape)
+for j in range(x.size):
+    h = 1e-6*max(abs(x[j]), 1)
+    x_p, x_m = x.copy(), x.copy()
+    x_p[j] += h
+    x_m[j] -= h
+    J_fd[:,j] = (atmosphere.dxdt_state(x_p) - atmosphere.dxdt_state(x_m))/(2*h)
+err = np.abs(J - J_fd)/(np.amax(np.abs(J_fd), axis=1, keepdims=True) + 1e-30) # error relative to the size of each row
+print('state size :', x.size)
+print('non-zero entries :', np.count_nonzero(J))
+print('max relative error :', np.amax(err))
+
+import matplotlib.pyplot as plt
+
+fig, ax1 = plt.subplots()
+ax1.set_title('Jacobian sparsity')
+ax1.spy(J, markersize=1)
+
+fig.tight_layout()
+plt.show()
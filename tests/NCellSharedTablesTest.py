@@ -0,0 +1,33 @@
+import sys
+sys.path.append('./../')
+
+from NCell import NCell
+import numpy as np
+import pickle
+from multiprocessing import Pool
+
+def to_run(atmosphere):
+    atmosphere.run_sim_euler(0.1, dt=0.01)
+    return atmosphere.get_state(atmosphere.time)
+
+if __name__ == '__main__':
+    alt_edges = np.array([500, 550, 600, 650])
+    S_i = [[10, 5], [100, 3], [7, 1]]
+    S_di = [[1, 2], [3, 0], [0, 1]]
+    D_i = [[4, 5], [2, 1], [1, 6]]
+    R_i = [[3], [2], [1]]
+    N_i = [1000, 2000, 3000]
+    target_alts = [800, 550]
+    lam = [50, 10]
+    atmosphere = NCell(S_i, S_di, D_i, N_i, target_alts, alt_edges, lam, R_i=R_i, lam_rb=[[1], [0], [2]], expl_rate_L=[1, 2],
+                       expl_rate_R=[1], m_s=[250, 1000], num_dir=100, setF107=150)
+    ref = to_run(pickle.loads(pickle.dumps(atmosphere)))
+    print('pickled size (private tables) :', len(pickle.dumps(atmosphere)))
+
+    # the workers re-attach to the tables instead of receiving a copy of them
+    atmosphere.share_tables()
+    print('pickled size (shared tables) :', len(pickle.dumps(atmosphere)))
+    with Pool(processes=4) as pool:
+        results = pool.map(to_run, [atmosphere]*4)
+    atmosphere.release_tables(unlink=True)
+    print('max difference :', max(np.amax(np.abs(x - ref)) for x in results))
@@ -0,0 +1,44 @@
+import sys
+sys.path.append('./../')
+
+from NCell import NCell
+from NumbaKernels import numba_available
+from copy import deepcopy
+import numpy as np
+import time
+
+# compare the numpy and numba backends for updating the drag lifetimes
+alt_edges = np.arange(500, 1010, 50)
+num_cells = len(alt_edges) - 1
+S_i = [[10, 5, 1]]*num_cells
+S_di = [[1, 0, 0]]*num_cells
+D_i = [[4, 5, 1]]*num_cells
+N_i = [1000]*num_cells
+R_i = [[1]]*num_cells
+target_alts = [550, 750, 900]
+lam = [500, 100, 50]
+if not numba_available : print('numba is not installed, both runs use the numpy backend')
+atmos_np = NCell(S_i, S_di, D_i, N_i, target_alts, alt_edges, lam, R_i=R_i, num_dir=100, backend='numpy')
+atmos_nb = deepcopy(atmos_np)
+atmos_nb.backend = 'numba' if numba_available else 'numpy'
+atmos_nb.update_lifetimes(0) # compile the kernels
+
+times = np.linspace(0, 11, 12) # one year steps through the solar cycle
+t0 = time.time()
+for t in times : atmos_np.update_lifetimes(t)
+time_np = time.time() - t0
+t0 = time.time()
+for t in times : atmos_nb.update_lifetimes(t)
+time_nb = time.time() - t0
+
+print('numpy backend time :', time_np, 's')
+print('numba backend time :', time_nb, 's')
+print('speedup :', time_np/time_nb)
+for key in ['tau_sat', 'tau_rb', 'tau_N']:
+    print(key, 'max relative difference :', np.amax(np.abs(getattr(atmos_nb, key) - getattr(atmos_np, key))/getattr(atmos_np, key)))
+
+# check that the rates agree as well
+atmos_np.run_sim_euler(1, dt=0.01)
+atmos_nb.run_sim_euler(1, dt=0.01)
+N_np, N_nb = np.array(atmos_np.get_N()), np.array(atmos_nb.get_N())
+print('debris max relative difference after 1yr :', np.amax(np.abs(N_nb - N_np)/N_np))
@@ -0,0 +1,26 @@
+import sys
+sys.path.append('./../')
+
+from NCell import NCell
+from Sweep import run_sweep, load_result
+import numpy as np
+
+if __name__ == '__main__':
+    alt_edges = np.array([500, 550, 600, 650])
+    S_i = [[10, 5], [100, 3], [7, 1]]
+    S_di = [[1, 2], [3, 0], [0, 1]]
+    D_i = [[4, 5], [2, 1], [1, 6]]
+    R_i = [[3], [2], [1]]
+    N_i = [1000, 2000, 3000]
+    target_alts = [800, 550]
+    lam = np.array([50, 10])
+    atmosphere = NCell(S_i, S_di, D_i, N_i, target_alts, alt_edges, lam.tolist(), R_i=R_i, lam_rb=[[1], [0], [2]],
+                       expl_rate_L=[1, 2], expl_rate_R=[1], m_s=[250, 1000], num_dir=100, setF107=150)
+
+    # the second call finds every scenario in the store, and doesn't run anything
+    grids = {'lam_sat' : [lam*fac for fac in np.linspace(1, 2, 3)], 'alpha_N' : np.linspace(0.01, 0.2, 3)}
+    for _ in range(2):
+        index = run_sweep(atmosphere, grids, 'SweepTestData/', 1, np.linspace(0, 1, 11), integrator='rk', processes=4)
+    for row in index:
+        result = load_result('SweepTestData/', row['index'])
+        print(row['index'], row['status'], round(row['run_time'], 2), 'total N at T :', np.sum(result['N'][-1]))